@@ -7,46 +7,79 @@ Distributed under the GNU General Public License at gnu.org/licenses/gpl.html.
 
 """Functions for building CDFs (cumulative distribution functions)."""
 
-import bisect
 import math
 import random
+
+import numpy
 import Pmf
+import thinkstats
 
 
 class Cdf(object):
     """Represents a cumulative distribution function.
 
     Attributes:
-        xs: sequence of values
-        ps: sequence of probabilities
+        xs: sorted array of values
+        ps: array of cumulative probabilities, parallel to xs
         name: string used as a graph label.
     """
     def __init__(self, xs=None, ps=None, name=''):
-        self.xs = xs or []
-        self.ps = ps or []
+        if xs is None:
+            xs = []
+        if ps is None:
+            ps = []
+        self.xs = numpy.asarray(xs)
+        if (self.xs.dtype.kind in 'SU' and
+            not all(isinstance(x, basestring) for x in xs)):
+            # numpy would turn the numbers into strings
+            self.xs = numpy.array(list(xs), dtype=object)
+        self.ps = numpy.asarray(ps, dtype=numpy.float64)
         self.name = name
 
-    def Values(self):
-        """Returns a sorted list of values.
+    def Values(self, ps=None):
+        """Returns a sorted array of values, or the values for given probs.
+
+        Args:
+            ps: optional sequence of probabilities in the range [0, 1];
+                if provided, returns InverseCDF(p) for each p in a
+                single search, as in Value
+
+        Returns:
+            array of values
         """
-        return self.xs
+        if ps is None:
+            return self.xs
+
+        ps = numpy.asarray(ps, dtype=numpy.float64)
+        if ((ps < 0) | (ps > 1)).any():
+            raise ValueError('Probability p must be in range [0, 1]')
+
+        n = len(self.ps)
+        index = self.ps.searchsorted(ps, side='right')
+        prev = numpy.maximum(index - 1, 0)
+        exact = (index > 0) & (self.ps[prev] == ps)
+        index = numpy.where(exact, prev, numpy.minimum(index, n - 1))
+        index = numpy.where(ps == 0, 0, index)
+        index = numpy.where(ps == 1, n - 1, index)
+        return self.xs[index]
 
     def Items(self):
         """Returns a sorted sequence of (value, probability) pairs.
 
         Note: in Python3, returns an iterator.
         """
-        return zip(self.xs, self.ps)
+        return zip(self.xs.tolist(), self.ps.tolist())
 
     def Append(self, x, p):
         """Add an (x, p) pair to the end of this CDF.
 
         Note: this us normally used to build a CDF from scratch, not
         to modify existing CDFs.  It is up to the caller to make sure
-        that the result is a legal CDF.
+        that the result is a legal CDF.  Each call copies the arrays,
+        so it is better to build the arrays first and pass them to Cdf.
         """
-        self.xs.append(x)
-        self.ps.append(p)
+        self.xs = numpy.append(self.xs, x)
+        self.ps = numpy.append(self.ps, p)
 
     def Prob(self, x):
         """Returns CDF(x), the probability that corresponds to value x.
@@ -58,9 +91,22 @@ class Cdf(object):
             float probability
         """
         if x < self.xs[0]: return 0.0
-        index = bisect.bisect(self.xs, x)
+        index = self.xs.searchsorted(x, side='right')
         p = self.ps[index-1]
-        return p
+        return p.item()
+
+    def Probs(self, xs):
+        """Returns CDF(x) for each x in a sequence, in a single search.
+
+        Args:
+            xs: sequence of numbers
+
+        Returns:
+            array of float probabilities
+        """
+        index = self.xs.searchsorted(xs, side='right')
+        ps = numpy.concatenate([[0.0], self.ps])
+        return ps[index]
 
     def Value(self, p):
         """Returns InverseCDF(p), the value that corresponds to probability p.
@@ -74,13 +120,20 @@ class Cdf(object):
         if p < 0 or p > 1:
             raise ValueError('Probability p must be in range [0, 1]')
 
-        if p == 0: return self.xs[0]
-        if p == 1: return self.xs[-1]
-        index = bisect.bisect(self.ps, p)
+        if p == 0: return self._Value(0)
+        if p == 1: return self._Value(-1)
+        index = self.ps.searchsorted(p, side='right')
         if p == self.ps[index-1]:
-            return self.xs[index-1]
+            return self._Value(index-1)
         else:
-            return self.xs[index]
+            return self._Value(index)
+
+    def _Value(self, i):
+        """Gets the value at index i as a Python object."""
+        x = self.xs[i]
+        if isinstance(x, numpy.generic):
+            return x.item()
+        return x
 
     def Percentile(self, p):
         """Returns the value that corresponds to percentile p.
@@ -97,13 +150,19 @@ class Cdf(object):
         """Chooses a random value from this distribution."""
         return self.Value(random.random())
     
-    def Sample(self, n):
+    def Sample(self, n, seed=None):
         """Generates a random sample from this distribution.
         
         Args:
             n: int length of the sample
+            seed: None, int, random.Random or numpy.random.RandomState;
+                  see thinkstats.RandomState
+
+        Returns:
+            array of values
         """
-        return [self.Random() for i in range(n)]
+        state = thinkstats.RandomState(seed)
+        return self.Values(state.random_sample(n))
 
     def Mean(self):
         """Computes the mean of a CDF.
@@ -111,13 +170,24 @@ class Cdf(object):
         Returns:
             float mean
         """
-        old_p = 0
-        total = 0.0
-        for x, new_p in zip(self.xs, self.ps):
-            p = new_p - old_p
-            total += p * x
-            old_p = new_p
-        return total
+        ps = numpy.diff(numpy.concatenate([[0.0], self.ps]))
+        return numpy.dot(ps, self.xs).item()
+
+    def Var(self, mu=None):
+        """Computes the variance of a CDF.
+
+        Args:
+            mu: the point around which the variance is computed;
+                if omitted, computes the mean
+
+        Returns:
+            float variance
+        """
+        if mu is None:
+            mu = self.Mean()
+        ps = numpy.diff(numpy.concatenate([[0.0], self.ps]))
+        dev = self.xs - mu
+        return numpy.dot(ps, dev * dev).item()
 
     def _Round(self, multiplier=1000.0):
         """
@@ -138,18 +208,9 @@ class Cdf(object):
         Returns:
             tuple of (xs, ps)
         """
-        xs = [self.xs[0]]
-        ps = [0.0]
-        for i, p in enumerate(self.ps):
-            xs.append(self.xs[i])
-            ps.append(p)
-
-            try:
-                xs.append(self.xs[i+1])
-                ps.append(p)
-            except IndexError:
-                pass
-        return xs, ps
+        xs = numpy.repeat(self.xs, 2)
+        ps = numpy.concatenate([[0.0], numpy.repeat(self.ps, 2)[:-1]])
+        return xs.tolist(), ps.tolist()
 
 
 def MakeCdfFromItems(items, name=''):
@@ -162,17 +223,15 @@ def MakeCdfFromItems(items, name=''):
     Returns:
         cdf: list of (value, fraction) pairs
     """
-    runsum = 0
-    xs = []
-    cs = []
-
-    for value, count in sorted(items):
-        runsum += count
-        xs.append(value)
-        cs.append(runsum)
+    items = sorted(items)
+    xs = [value for value, _ in items]
+    cs = numpy.cumsum([count for _, count in items])
 
-    total = float(runsum)
-    ps = [c/total for c in cs]
+    if len(cs):
+        total = float(cs[-1])
+        ps = cs / total
+    else:
+        ps = []
 
     cdf = Cdf(xs, ps, name)
     return cdf
@@ -229,7 +288,16 @@ def MakeCdfFromList(seq, name=''):
     Returns:
        Cdf object
     """
-    hist = Pmf.MakeHistFromList(seq)
-    return MakeCdfFromHist(hist, name)
+    t = numpy.asarray(seq)
+    if t.ndim != 1 or t.dtype.kind not in 'biuf':
+        # not all numbers, so numpy would coerce them to strings or
+        # objects; count them with a Hist
+        hist = Pmf.MakeHistFromList(seq)
+        return MakeCdfFromHist(hist, name)
+
+    # sort once and count the repeated values
+    xs, counts = numpy.unique(t, return_counts=True)
+    ps = counts.cumsum() / float(max(len(t), 1))
+    return Cdf(xs, ps, name)
 
 
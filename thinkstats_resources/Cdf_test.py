@@ -5,8 +5,10 @@ Copyright 2008 Allen B. Downey.
 Distributed under the GNU General Public License at gnu.org/licenses/gpl.html.
 """
 
+import random
 import unittest
 import Cdf
+import Pmf
 
 class Test(unittest.TestCase):
 
@@ -16,8 +18,8 @@ class Test(unittest.TestCase):
         self.checkCdf(cdf)
 
     def checkCdf(self, cdf):
-        self.assertEqual(cdf.xs, [1, 2, 3, 5])
-        self.assertEqual(cdf.ps, [0.2, 0.6, 0.8, 1.0])
+        self.assertEqual(list(cdf.xs), [1, 2, 3, 5])
+        self.assertEqual(list(cdf.ps), [0.2, 0.6, 0.8, 1.0])
         self.assertEqual(cdf.name, 'bob')
 
     def testProb(self):
@@ -55,6 +57,13 @@ class Test(unittest.TestCase):
         cdf = Cdf.MakeCdfFromList(t, 'bob')
         self.assertAlmostEqual(cdf.Mean(), 13.0/5.0)
 
+    def testVar(self):
+        t = [2, 1, 3, 2, 5]
+        cdf = Cdf.MakeCdfFromList(t, 'bob')
+        pmf = Pmf.MakePmfFromList(t)
+        self.assertAlmostEqual(cdf.Var(), pmf.Var())
+        self.assertAlmostEqual(cdf.Var(0), 43.0/5.0)
+
     def testItems(self):
         t = [2, 1, 3, 2, 5]
         cdf = Cdf.MakeCdfFromList(t, 'bob')
@@ -74,6 +83,52 @@ class Test(unittest.TestCase):
         for got, expected in zip(ps, [0.0, 0.2, 0.2, 0.6, 0.6, 0.8, 0.8, 1.0]):
             self.assertAlmostEqual(got, expected)
 
+    def testMakeCdfFromListLarge(self):
+        random.seed(2)
+        t = [random.randint(0, 100) for i in range(1000)]
+        t += [random.random() for i in range(1000)]
+
+        cdf = Cdf.MakeCdfFromList(t)
+        hist_cdf = Cdf.MakeCdfFromHist(Pmf.MakeHistFromList(t))
+        self.assertEqual(list(cdf.xs), list(hist_cdf.xs))
+        self.assertEqual(list(cdf.ps), list(hist_cdf.ps))
+        self.assertEqual(len(Cdf.MakeCdfFromList([]).xs), 0)
+
+    def testMakeCdfFromListMixed(self):
+        t = [1, 2, 'NA', 'NA']
+        cdf = Cdf.MakeCdfFromList(t)
+        self.assertEqual(cdf.Prob(1), 0.25)
+        self.assertEqual(cdf.Prob(2), 0.5)
+        self.assertEqual(cdf.Prob('NA'), 1.0)
+        self.assertEqual(cdf.Value(0.5), 2)
+
+    def testProbs(self):
+        t = [2, 1, 3, 2, 5]
+        cdf = Cdf.MakeCdfFromList(t, 'bob')
+
+        xs = [-1, 1, 2, 2.5, 4, 5, 7]
+        ps = cdf.Probs(xs)
+        self.assertEqual(list(ps), [cdf.Prob(x) for x in xs])
+
+    def testValues(self):
+        t = [2, 1, 3, 2, 5]
+        cdf = Cdf.MakeCdfFromList(t, 'bob')
+        self.assertEqual(list(cdf.Values()), [1, 2, 3, 5])
+
+        ps = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+        xs = cdf.Values(ps)
+        self.assertEqual(list(xs), [cdf.Value(p) for p in ps])
+        self.assertRaises(ValueError, cdf.Values, [0.5, 1.1])
+
+    def testSample(self):
+        t = [2, 1, 3, 2, 5]
+        cdf = Cdf.MakeCdfFromList(t, 'bob')
+
+        sample = cdf.Sample(1000, seed=1)
+        self.assertEqual(sorted(set(sample)), [1, 2, 3, 5])
+        self.assertEqual(list(cdf.Sample(1000, seed=1)), list(sample))
+        self.assertAlmostEqual(Cdf.MakeCdfFromList(sample).Prob(2), 0.6, 1)
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testCdf']
     unittest.main()
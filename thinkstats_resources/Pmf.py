@@ -13,11 +13,19 @@ Pmf: represents a probability mass function (map from values to probs).
 
 _DictWrapper: private parent class for Hist and Pmf.
 
+ArrayHist, ArrayPmf: versions of Hist and Pmf that keep numerical values
+and their freqs/probs in sorted NumPy arrays.
+
+_ArrayWrapper: private parent class for ArrayHist and ArrayPmf.
+
 """
 
 import logging
 import random
 
+import numpy
+import thinkstats
+
 class _DictWrapper(object):
     """An object that contains a dictionary."""
 
@@ -28,6 +36,10 @@ class _DictWrapper(object):
         self.d = d
         self.name = name
 
+        # cumulative probabilities used by Pmf.Random; methods that
+        # modify the map set this back to None
+        self._cumulative = None
+
     def GetDict(self):
         """Gets the dictionary."""
         return self.d
@@ -66,6 +78,7 @@ class _DictWrapper(object):
             y: number freq or prob
         """
         self.d[x] = y
+        self._cumulative = None
 
     def Incr(self, x, term=1):
         """Increments the freq/prob associated with the value x.
@@ -75,6 +88,7 @@ class _DictWrapper(object):
             term: how much to increment by
         """
         self.d[x] = self.d.get(x, 0) + term
+        self._cumulative = None
 
     def Mult(self, x, factor):
         """Scales the freq/prob associated with the value x.
@@ -84,6 +98,7 @@ class _DictWrapper(object):
             factor: how much to multiply by
         """
         self.d[x] = self.d.get(x, 0) * factor
+        self._cumulative = None
 
     def Remove(self, x):
         """Removes a value.
@@ -94,6 +109,7 @@ class _DictWrapper(object):
             x: value to remove
         """
         del self.d[x]
+        self._cumulative = None
 
     def Total(self):
         """Returns the total of the frequencies/probabilities in the map."""
@@ -193,20 +209,65 @@ class Pmf(_DictWrapper):
         factor = float(fraction) / total
         for x in self.d:
             self.d[x] *= factor
-    
+        self._cumulative = None
+
+    def _Cumulative(self):
+        """Gets the values and their cumulative probabilities.
+
+        The result is computed when it is first needed and kept until
+        the Pmf is modified through one of its methods.
+
+        Returns:
+            tuple of (sequence of values, array of cumulative probs)
+        """
+        if self._cumulative is None:
+            items = self.Items()
+            xs = [x for x, _ in items]
+            cs = numpy.cumsum([p for _, p in items], dtype=numpy.float64)
+            self._cumulative = xs, cs
+        return self._cumulative
+
+    def _Choose(self, targets):
+        """Finds the indices of values that correspond to random targets.
+
+        Args:
+            targets: float or array of floats in [0, 1)
+
+        Returns:
+            int index or array of indices into the values
+        """
+        xs, cs = self._Cumulative()
+        if len(xs) == 0:
+            raise ValueError('cannot choose from an empty Pmf.')
+        i = cs.searchsorted(targets * cs[-1], side='right')
+        return numpy.minimum(i, len(xs) - 1)
+
     def Random(self):
         """Chooses a random element from this PMF.
 
+        Uses a binary search over the cumulative probabilities, so each
+        draw takes O(log n) time.
+
         Returns:
-            float mean
+            value from the PMF
         """
-        target = random.random()
-        total = 0.0
-        for x, p in self.d.iteritems():
-            total += p
-            if total >= target:
-                return x
-        return x
+        xs, cs = self._Cumulative()
+        return xs[self._Choose(random.random())]
+
+    def Sample(self, n, seed=None):
+        """Chooses n random elements from this PMF.
+
+        Args:
+            n: int length of the sample
+            seed: None, int, random.Random or numpy.random.RandomState;
+                  see thinkstats.RandomState
+
+        Returns:
+            list of values
+        """
+        xs, cs = self._Cumulative()
+        state = thinkstats.RandomState(seed)
+        return [xs[i] for i in self._Choose(state.random_sample(n))]
 
     def Mean(self):
         """Computes the mean of a PMF.
@@ -238,6 +299,308 @@ class Pmf(_DictWrapper):
         return var
 
 
+class _ArrayWrapper(_DictWrapper):
+    """An object that contains sorted arrays of values and freqs/probs.
+
+    Provides the same interface as _DictWrapper, but the values must be
+    numbers.  Operations on the whole distribution are array operations;
+    adding a new value one at a time is O(n), so it is better to build
+    these objects from a dictionary or from arrays.
+
+    Attributes:
+        xs: sorted array of values
+        ps: array of freqs/probs, parallel to xs
+        name: string name
+
+    Code that assigns to xs or ps directly should use SetArrays instead,
+    or cached results like the table used by Random will be stale.
+    """
+
+    def __init__(self, d=None, name=''):
+        if d is None:
+            d = {}
+        self.name = name
+        self.SetArrays(d.keys(), d.values())
+
+    def SetArrays(self, xs, ps):
+        """Replaces the contents with the given values and freqs/probs.
+
+        The values need not be sorted or distinct; the freqs/probs of
+        repeated values are added up.
+
+        Args:
+            xs: sequence of values
+            ps: sequence of freqs/probs
+        """
+        xs = numpy.asarray(xs)
+        ps = numpy.asarray(ps)
+        if len(xs) == 0:
+            xs = numpy.array([], dtype=numpy.int64)
+            ps = numpy.array([], dtype=numpy.int64)
+        elif len(xs) > 1 and not (xs[1:] > xs[:-1]).all():
+            order = numpy.argsort(xs, kind='mergesort')
+            xs = xs[order]
+            ps = ps[order]
+            starts = numpy.flatnonzero(numpy.r_[True, xs[1:] != xs[:-1]])
+            xs = xs[starts]
+            ps = numpy.add.reduceat(ps, starts)
+        self.xs = xs
+        self.ps = ps
+        self._cumulative = None
+
+    def GetDict(self):
+        """Gets a dictionary that maps from values to freqs/probs.
+
+        Note: the dictionary is a copy; changing it does not change
+        this object.
+        """
+        return dict(self.Items())
+
+    def Values(self):
+        """Gets a sorted sequence of values."""
+        return self.xs.tolist()
+
+    def Items(self):
+        """Gets a sorted sequence of (value, freq/prob) pairs."""
+        return zip(self.xs.tolist(), self.ps.tolist())
+
+    def Render(self):
+        """Generates a sequence of points suitable for plotting.
+
+        Returns:
+            tuple of (sorted value array, freq/prob array)
+        """
+        return self.xs.copy(), self.ps.copy()
+
+    def Print(self):
+        """Prints the values and freqs/probs in ascending order."""
+        for val, prob in self.Items():
+            print val, prob
+
+    def _Index(self, x):
+        """Finds the index of x in xs.
+
+        Returns:
+            tuple of (int index, boolean whether x is there)
+        """
+        i = self.xs.searchsorted(x)
+        return i, i < len(self.xs) and self.xs[i] == x
+
+    def _Insert(self, i, x, y):
+        """Inserts the value x with freq/prob y at index i."""
+        xs_type = numpy.result_type(self.xs, numpy.min_scalar_type(x))
+        ps_type = numpy.result_type(self.ps, numpy.min_scalar_type(y))
+        self.xs = numpy.insert(self.xs.astype(xs_type), i, x)
+        self.ps = numpy.insert(self.ps.astype(ps_type), i, y)
+        self._cumulative = None
+
+    def _Store(self, i, y):
+        """Stores the freq/prob y at index i, converting ps if needed."""
+        ps_type = numpy.result_type(self.ps, numpy.min_scalar_type(y))
+        if ps_type != self.ps.dtype:
+            self.ps = self.ps.astype(ps_type)
+        self.ps[i] = y
+        self._cumulative = None
+
+    def Set(self, x, y=0):
+        """Sets the freq/prob associated with the value x.
+
+        Args:
+            x: number value
+            y: number freq or prob
+        """
+        i, found = self._Index(x)
+        if found:
+            self._Store(i, y)
+        else:
+            self._Insert(i, x, y)
+
+    def Incr(self, x, term=1):
+        """Increments the freq/prob associated with the value x.
+
+        Args:
+            x: number value
+            term: how much to increment by
+        """
+        i, found = self._Index(x)
+        if found:
+            self._Store(i, self.ps[i] + term)
+        else:
+            self._Insert(i, x, term)
+
+    def Mult(self, x, factor):
+        """Scales the freq/prob associated with the value x.
+
+        Args:
+            x: number value
+            factor: how much to multiply by
+        """
+        i, found = self._Index(x)
+        if found:
+            self._Store(i, self.ps[i] * factor)
+        else:
+            self._Insert(i, x, 0)
+
+    def Remove(self, x):
+        """Removes a value.
+
+        Throws an exception if the value is not there.
+
+        Args:
+            x: value to remove
+        """
+        i, found = self._Index(x)
+        if not found:
+            raise KeyError(x)
+        self.xs = numpy.delete(self.xs, i)
+        self.ps = numpy.delete(self.ps, i)
+        self._cumulative = None
+
+    def Total(self):
+        """Returns the total of the frequencies/probabilities in the map."""
+        return self.ps.sum().item()
+
+
+class ArrayHist(_ArrayWrapper, Hist):
+    """Represents a histogram as sorted arrays of values and frequencies."""
+
+    def Copy(self, name=None):
+        """Returns a copy of this ArrayHist.
+
+        Args:
+            name: string name for the new ArrayHist
+        """
+        if name is None:
+            name = self.name
+        hist = ArrayHist(name=name)
+        hist.xs = self.xs.copy()
+        hist.ps = self.ps.copy()
+        return hist
+
+    def Freq(self, x):
+        """Gets the frequency associated with the value x.
+
+        Args:
+            x: number value
+
+        Returns:
+            int frequency
+        """
+        i, found = self._Index(x)
+        if found:
+            return self.ps[i].item()
+        return 0
+
+    def Freqs(self):
+        """Gets a sequence of frequencies, sorted by value."""
+        return self.ps.tolist()
+
+
+class ArrayPmf(_ArrayWrapper, Pmf):
+    """Represents a PMF as sorted arrays of values and probabilities."""
+
+    def Copy(self, name=None):
+        """Returns a copy of this ArrayPmf.
+
+        Args:
+            name: string name for the new ArrayPmf
+        """
+        if name is None:
+            name = self.name
+        pmf = ArrayPmf(name=name)
+        pmf.xs = self.xs.copy()
+        pmf.ps = self.ps.copy()
+        return pmf
+
+    def Prob(self, x):
+        """Gets the probability associated with the value x.
+
+        Args:
+            x: number value
+
+        Returns:
+            float probability
+        """
+        i, found = self._Index(x)
+        if found:
+            return self.ps[i].item()
+        return 0
+
+    def Probs(self):
+        """Gets a sequence of probabilities, sorted by value."""
+        return self.ps.tolist()
+
+    def Normalize(self, fraction=1.0):
+        """Normalizes this PMF so the sum of all probs is 1.
+
+        Args:
+            fraction: what the total should be after normalization
+        """
+        total = self.Total()
+        if total == 0.0:
+            raise ValueError('total probability is zero.')
+
+        factor = float(fraction) / total
+        self.ps = self.ps * factor
+        self._cumulative = None
+
+    def _Cumulative(self):
+        """Gets the values and their cumulative probabilities.
+
+        Returns:
+            tuple of (array of values, array of cumulative probs)
+        """
+        if self._cumulative is None:
+            cs = self.ps.cumsum(dtype=numpy.float64)
+            self._cumulative = self.xs, cs
+        return self._cumulative
+
+    def Random(self):
+        """Chooses a random element from this PMF.
+
+        Returns:
+            value from the PMF
+        """
+        return self.xs[self._Choose(random.random())].item()
+
+    def Sample(self, n, seed=None):
+        """Chooses n random elements from this PMF.
+
+        Args:
+            n: int length of the sample
+            seed: None, int, random.Random or numpy.random.RandomState;
+                  see thinkstats.RandomState
+
+        Returns:
+            array of values
+        """
+        state = thinkstats.RandomState(seed)
+        return self.xs[self._Choose(state.random_sample(n))]
+
+    def Mean(self):
+        """Computes the mean of a PMF.
+
+        Returns:
+            float mean
+        """
+        return numpy.dot(self.xs, self.ps).item()
+
+    def Var(self, mu=None):
+        """Computes the variance of a PMF.
+
+        Args:
+            mu: the point around which the variance is computed;
+                if omitted, computes the mean
+
+        Returns:
+            float variance
+        """
+        if mu is None:
+            mu = self.Mean()
+        dev = self.xs - mu
+        return numpy.dot(self.ps, dev * dev).item()
+
+
 def MakeHistFromList(t, name=''):
     """Makes a histogram from an unsorted sequence of values.
 
@@ -337,6 +700,60 @@ def MakePmfFromCdf(cdf, name=None):
     return pmf
 
 
+def MakeArrayHistFromList(t, name=''):
+    """Makes an ArrayHist from an unsorted sequence of numbers.
+
+    Args:
+        t: sequence of numbers
+        name: string name for this histogram
+
+    Returns:
+        ArrayHist object
+    """
+    hist = ArrayHist(name=name)
+    xs, counts = numpy.unique(t, return_counts=True)
+    hist.xs = xs
+    hist.ps = counts.astype(numpy.int64)
+    return hist
+
+
+def MakeArrayPmfFromList(t, name=''):
+    """Makes an ArrayPmf from an unsorted sequence of numbers.
+
+    Args:
+        t: sequence of numbers
+        name: string name for this PMF
+
+    Returns:
+        ArrayPmf object
+    """
+    hist = MakeArrayHistFromList(t, name)
+    return MakeArrayPmfFromHist(hist)
+
+
+def MakeArrayPmfFromHist(hist, name=None):
+    """Makes a normalized ArrayPmf from a Hist or ArrayHist.
+
+    Args:
+        hist: Hist or ArrayHist object
+        name: string name
+
+    Returns:
+        ArrayPmf object
+    """
+    if name is None:
+        name = hist.name
+
+    if isinstance(hist, _ArrayWrapper):
+        pmf = ArrayPmf(name=name)
+        pmf.xs = hist.xs.copy()
+        pmf.ps = hist.ps.astype(numpy.float64)
+    else:
+        pmf = ArrayPmf(hist.GetDict(), name)
+    pmf.Normalize()
+    return pmf
+
+
 def MakeMixture(pmfs, name='mix'):
     """Make a mixture distribution.
 
@@ -5,6 +5,7 @@ Copyright 2010 Allen B. Downey
 License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
+import random
 import unittest
 import thinkstats
 import Pmf
@@ -27,12 +28,12 @@ class Test(unittest.TestCase):
         pmf.Print()
         self.checkPmf(pmf)
 
-    def checkPmf(self, pmf):
-        self.assertAlmostEquals(pmf.Prob(1), 0.2)
-        self.assertAlmostEquals(pmf.Prob(2), 0.4)
-        self.assertAlmostEquals(pmf.Prob(3), 0.2)
-        self.assertAlmostEquals(pmf.Prob(4), 0.0)
-        self.assertAlmostEquals(pmf.Prob(5), 0.2)
+    def checkPmf(self, pmf, places=7):
+        self.assertAlmostEquals(pmf.Prob(1), 0.2, places)
+        self.assertAlmostEquals(pmf.Prob(2), 0.4, places)
+        self.assertAlmostEquals(pmf.Prob(3), 0.2, places)
+        self.assertAlmostEquals(pmf.Prob(4), 0.0, places)
+        self.assertAlmostEquals(pmf.Prob(5), 0.2, places)
 
     def testMakePmf(self):
         t = [1, 2, 2, 3, 5]
@@ -106,5 +107,81 @@ class Test(unittest.TestCase):
         pmf2 = Pmf.MakePmfFromCdf(cdf)
         self.checkPmf(pmf2)
 
+    def testArrayPmf(self):
+        t = [1, 2, 2, 3, 5]
+        pmf = Pmf.MakeArrayPmfFromList(t)
+        self.checkPmf(pmf)
+        self.assertEquals(pmf.Values(), [1, 2, 3, 5])
+
+        hist = Pmf.MakeHistFromList(t)
+        self.checkPmf(Pmf.MakeArrayPmfFromHist(hist))
+        self.checkPmf(Pmf.ArrayPmf(Pmf.MakePmfFromList(t).GetDict()))
+        self.checkPmf(Pmf.MakePmfFromDict(pmf.GetDict()))
+
+        xs, ps = pmf.Render()
+        self.assertEquals(list(xs), [1, 2, 3, 5])
+
+        dict_pmf = Pmf.MakePmfFromList(t)
+        self.assertAlmostEquals(pmf.Mean(), dict_pmf.Mean())
+        self.assertAlmostEquals(pmf.Var(), dict_pmf.Var())
+        self.assertAlmostEquals(pmf.Var(2), dict_pmf.Var(2))
+
+        copy = pmf.Copy('copy')
+        copy.Mult(2, 0)
+        self.assertAlmostEquals(pmf.Prob(2), 0.4)
+        self.assertEquals(copy.name, 'copy')
+
+    def testArrayPmfIncrAndNormalize(self):
+        pmf = Pmf.ArrayPmf()
+        for x in [5, 3, 2, 1, 2]:
+            pmf.Incr(x)
+        pmf.Normalize()
+        self.checkPmf(pmf)
+
+        pmf.Set(4, 0.5)
+        pmf.Incr(0.5, 0.5)
+        pmf.Remove(4)
+        self.assertEquals(pmf.Values(), [0.5, 1, 2, 3, 5])
+        self.assertAlmostEquals(pmf.Total(), 1.5)
+        self.assertRaises(KeyError, pmf.Remove, 4)
+
+    def testArrayHist(self):
+        hist = Pmf.MakeArrayHistFromList([1, 2, 2, 3, 5])
+        self.assertEquals(hist.Freq(2), 2)
+        self.assertEquals(hist.Freq(4), 0)
+        self.assertEquals(hist.Freqs(), [1, 2, 1, 1])
+
+        other = hist.Copy()
+        other.Incr(4)
+        self.assertTrue(hist.IsSubset(other))
+        other.Subtract(hist)
+        self.assertEquals(other.Total(), 1)
+
+    def testRandomAndSample(self):
+        for pmf in [Pmf.MakePmfFromList([1, 2, 2, 3, 5]),
+                    Pmf.MakeArrayPmfFromList([1, 2, 2, 3, 5])]:
+            random.seed(17)
+            t = [pmf.Random() for i in range(1000)]
+            self.assertEquals(sorted(set(t)), [1, 2, 3, 5])
+
+            sample = pmf.Sample(10000, seed=17)
+            self.assertEquals(len(sample), 10000)
+            self.checkPmf(Pmf.MakePmfFromList(list(sample)), places=1)
+            self.assertEquals(list(pmf.Sample(100, seed=17)),
+                              list(sample[:100]))
+
+            rng = random.Random(3)
+            sample1 = pmf.Sample(100, rng)
+            rng = random.Random(3)
+            self.assertEquals(list(pmf.Sample(100, rng)), list(sample1))
+
+            # the cumulative table is rebuilt after a change
+            pmf.Set(2, 0)
+            pmf.Set(3, 0)
+            pmf.Normalize()
+            self.assertEquals(sorted(set(pmf.Sample(1000))), [1, 5])
+            self.assertTrue(pmf.Random() in [1, 5])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,512 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2010 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+"""This file contains class definitions for:
+
+Suite: represents a suite of hypotheses and their probabilities,
+with updates that evaluate the likelihood of all hypotheses at once.
+
+LogPosterior: accumulates the log probabilities of a suite over a
+stream of evidence and makes Suites from them on demand.
+
+JointSuite: represents hypotheses about two or more parameters as a
+dense grid, with updates evaluated by broadcasting.
+"""
+
+import numpy
+
+import Cdf
+import Pmf
+
+
+class Suite(Pmf.ArrayPmf):
+    """Represents a suite of numerical hypotheses and their probabilities.
+
+    The hypotheses are the values of the Pmf, stored as a sorted array
+    (see Pmf.ArrayPmf).  A likelihood function takes the evidence and
+    the whole array of hypotheses and returns an array of likelihoods,
+    so an update is a few array operations instead of one function
+    call per hypothesis.
+    """
+
+    def Copy(self, name=None):
+        """Returns a copy of this Suite.
+
+        Args:
+            name: string name for the new Suite
+        """
+        if name is None:
+            name = self.name
+        suite = self.__class__(name=name)
+        suite.SetArrays(self.xs.copy(), self.ps.copy())
+        return suite
+
+    def Update(self, evidence, likelihood):
+        """Updates the suite based on new evidence.
+
+        Modifies the suite directly; if you want to keep the original,
+        make a copy.
+
+        Args:
+            evidence: whatever kind of object likelihood expects
+            likelihood: function that takes the evidence and an array of
+                        hypotheses and returns an array of likelihoods
+        """
+        self.ps = self.ps * likelihood(evidence, self.xs)
+        self._cumulative = None
+        self.Normalize()
+
+    def LogUpdate(self, evidence, log_likelihood):
+        """Updates the suite based on new evidence, in log space.
+
+        Adds the log likelihoods to the log probabilities and
+        normalizes with the log-sum-exp trick, so large amounts of
+        evidence do not underflow to a total probability of zero.
+
+        Args:
+            evidence: whatever kind of object log_likelihood expects
+            log_likelihood: function that takes the evidence and an array
+                            of hypotheses and returns an array of log
+                            likelihoods
+        """
+        self.SetLogProbs(self.LogProbs() + log_likelihood(evidence, self.xs))
+
+    def LogUpdateSet(self, dataset, log_likelihood, batch_size=1000):
+        """Updates the suite based on a sequence of observations.
+
+        Passes the observations to log_likelihood in batches, so the
+        arrays it builds stay small, and normalizes once at the end.
+
+        Args:
+            dataset: sequence of observations
+            log_likelihood: function that takes a sequence of observations
+                            and an array of hypotheses and returns an
+                            array of total log likelihoods
+            batch_size: how many observations to pass at a time
+        """
+        logps = self.LogProbs()
+        for i in range(0, len(dataset), batch_size):
+            logps += log_likelihood(dataset[i:i+batch_size], self.xs)
+        self.SetLogProbs(logps)
+
+    def LogProbs(self):
+        """Returns an array of log probabilities, sorted by value.
+
+        Hypotheses with probability 0 get -inf.
+        """
+        with numpy.errstate(divide='ignore'):
+            return numpy.log(self.ps)
+
+    def SetLogProbs(self, logps):
+        """Sets the probabilities from unnormalized log probabilities.
+
+        Args:
+            logps: array of log probabilities, parallel to xs
+        """
+        top = numpy.max(logps)
+        if not numpy.isfinite(top):
+            raise ValueError('total probability is zero.')
+
+        ps = numpy.exp(logps - top)
+        self.ps = ps / ps.sum()
+        self._cumulative = None
+
+    def MakeCdf(self, name=None):
+        """Makes a Cdf of the hypotheses.
+
+        Args:
+            name: string name for the Cdf
+
+        Returns:
+            Cdf object
+        """
+        if name is None:
+            name = self.name
+        cs = self.ps.cumsum(dtype=numpy.float64)
+        return Cdf.Cdf(self.xs, cs / cs[-1], name)
+
+    def CredibleInterval(self, percentage=90):
+        """Computes a credible interval for the hypotheses.
+
+        If percentage=90, computes the 90% CI.
+
+        Args:
+            percentage: float between 0 and 100
+
+        Returns:
+            list of two floats, low and high
+        """
+        prob = (1 - percentage / 100.0) / 2
+        return self.MakeCdf().Values([prob, 1 - prob]).tolist()
+
+
+class LogPosterior(object):
+    """Accumulates a posterior distribution over a stream of evidence.
+
+    Keeps the log probabilities of the hypotheses and adds the log
+    likelihood of each observation or batch of observations in place.
+    Snapshot makes a normalized Suite at any point, in time that
+    depends on the number of hypotheses but not on how much evidence
+    has been seen.
+
+    Attributes:
+        xs: sorted array of hypotheses
+        logps: array of unnormalized log probabilities, parallel to xs
+        name: string name used for snapshots
+    """
+
+    def __init__(self, prior, name=None):
+        """Starts from a prior distribution.
+
+        Args:
+            prior: Suite object; not modified
+            name: string name, or None to use the prior's
+        """
+        if name is None:
+            name = prior.name
+        self.xs = prior.xs.copy()
+        self.logps = prior.LogProbs()
+        self.name = name
+
+    def Update(self, evidence, log_likelihood):
+        """Updates the log probabilities based on new evidence.
+
+        Args:
+            evidence: an observation or batch of observations, whatever
+                      log_likelihood expects
+            log_likelihood: function that takes the evidence and an array
+                            of hypotheses and returns an array of log
+                            likelihoods
+        """
+        self.logps += log_likelihood(evidence, self.xs)
+
+        # keep the largest log probability at 0 so the sums stay small
+        top = self.logps.max()
+        if not numpy.isfinite(top):
+            raise ValueError('total probability is zero.')
+        self.logps -= top
+
+    def UpdateSet(self, dataset, log_likelihood, batch_size=1000):
+        """Updates with a sequence of observations, in batches.
+
+        Args:
+            dataset: sequence of observations
+            log_likelihood: function that takes a sequence of observations
+                            and an array of hypotheses and returns an
+                            array of total log likelihoods
+            batch_size: how many observations to pass at a time
+        """
+        for i in range(0, len(dataset), batch_size):
+            self.Update(dataset[i:i+batch_size], log_likelihood)
+
+    def Snapshot(self, name=None):
+        """Makes a Suite with the current posterior probabilities.
+
+        Args:
+            name: string name for the Suite, or None to use this name
+
+        Returns:
+            Suite object
+        """
+        if name is None:
+            name = self.name
+        suite = Suite(name=name)
+        suite.SetArrays(self.xs.copy(), numpy.zeros(len(self.xs)))
+        suite.SetLogProbs(self.logps)
+        return suite
+
+
+class JointSuite(object):
+    """Represents a joint distribution of two or more parameters.
+
+    The hypotheses are all combinations of values on a grid with one
+    sorted array of values per parameter, and ps is an N-d array with
+    one axis per parameter.  Likelihood functions get one argument per
+    parameter, shaped so they broadcast against each other (see
+    Params), so an update evaluates the whole grid with array
+    operations instead of looping over tuples of parameters.
+
+    Attributes:
+        axes: list of arrays, the values of each parameter
+        names: list of parameter names, parallel to axes
+        ps: array of probabilities with one axis per parameter
+        name: string name for this suite
+    """
+
+    def __init__(self, axes, names=None, name=''):
+        """Makes a suite with a uniform prior over the grid.
+
+        Args:
+            axes: sequence of sequences, the values of each parameter
+            names: sequence of parameter names
+            name: string name for this suite
+        """
+        self.axes = [numpy.asarray(axis, dtype=numpy.float64)
+                     for axis in axes]
+        if names is None:
+            names = ['x%d' % (i+1) for i in range(len(self.axes))]
+        self.names = list(names)
+        if len(self.names) != len(self.axes):
+            raise ValueError('need one name per axis.')
+
+        shape = tuple(len(axis) for axis in self.axes)
+        self.ps = numpy.ones(shape) / numpy.prod(shape)
+        self.name = name
+
+    def Copy(self, name=None):
+        """Returns a copy of this JointSuite.
+
+        Args:
+            name: string name for the new JointSuite
+        """
+        if name is None:
+            name = self.name
+        suite = JointSuite(self.axes, self.names, name)
+        suite.ps = self.ps.copy()
+        return suite
+
+    def Params(self):
+        """Returns the parameter values shaped to broadcast over the grid.
+
+        The array for axis i has the values along dimension i and
+        length 1 along the others, so an expression like mu + sigma
+        makes an array with the shape of ps.
+
+        Returns:
+            tuple of arrays, one per parameter
+        """
+        return numpy.ix_(*self.axes)
+
+    def Update(self, evidence, likelihood):
+        """Updates the suite based on new evidence.
+
+        Args:
+            evidence: whatever kind of object likelihood expects
+            likelihood: function that takes the evidence and one array
+                        per parameter (see Params) and returns an array
+                        of likelihoods that broadcasts to the grid
+        """
+        self.ps = self.ps * likelihood(evidence, *self.Params())
+        total = self.ps.sum()
+        if total == 0.0:
+            raise ValueError('total probability is zero.')
+        self.ps /= total
+
+    def LogUpdate(self, evidence, log_likelihood):
+        """Updates the suite based on new evidence, in log space.
+
+        Args:
+            evidence: whatever kind of object log_likelihood expects
+            log_likelihood: function that takes the evidence and one array
+                            per parameter and returns an array of log
+                            likelihoods that broadcasts to the grid
+        """
+        self.SetLogProbs(self.LogProbs() +
+                         log_likelihood(evidence, *self.Params()))
+
+    def LogUpdateSet(self, dataset, log_likelihood, batch_size=100):
+        """Updates the suite based on a sequence of observations.
+
+        The arrays a log likelihood builds for a batch usually have one
+        more dimension than the grid, so the default batches are
+        smaller than for a Suite.
+
+        Args:
+            dataset: sequence of observations
+            log_likelihood: function that takes a sequence of observations
+                            and one array per parameter and returns an
+                            array of total log likelihoods
+            batch_size: how many observations to pass at a time
+        """
+        params = self.Params()
+        logps = self.LogProbs()
+        for i in range(0, len(dataset), batch_size):
+            logps = logps + log_likelihood(dataset[i:i+batch_size], *params)
+        self.SetLogProbs(logps)
+
+    def LogProbs(self):
+        """Returns an array of log probabilities with the shape of ps."""
+        with numpy.errstate(divide='ignore'):
+            return numpy.log(self.ps)
+
+    def SetLogProbs(self, logps):
+        """Sets the probabilities from unnormalized log probabilities.
+
+        Args:
+            logps: array of log probabilities with the shape of ps
+        """
+        top = numpy.max(logps)
+        if not numpy.isfinite(top):
+            raise ValueError('total probability is zero.')
+
+        ps = numpy.exp(logps - top)
+        self.ps = ps / ps.sum()
+
+    def Axis(self, axis):
+        """Gets the index of an axis.
+
+        Args:
+            axis: int index or string parameter name
+
+        Returns:
+            int
+        """
+        if isinstance(axis, basestring):
+            return self.names.index(axis)
+        return axis
+
+    def Marginal(self, axis, name=None):
+        """Computes the marginal distribution of one parameter.
+
+        Args:
+            axis: int index or string parameter name
+            name: string name for the Suite, or None to use the
+                  parameter name
+
+        Returns:
+            Suite object
+        """
+        axis = self.Axis(axis)
+        if name is None:
+            name = self.names[axis]
+        others = tuple(i for i in range(self.ps.ndim) if i != axis)
+        suite = Suite(name=name)
+        suite.SetArrays(self.axes[axis].copy(), self.ps.sum(axis=others))
+        return suite
+
+    def Mean(self, axis):
+        """Computes the posterior mean of one parameter.
+
+        Args:
+            axis: int index or string parameter name
+
+        Returns:
+            float
+        """
+        return self.Marginal(axis).Mean()
+
+    def CredibleInterval(self, axis, percentage=90):
+        """Computes a credible interval for one parameter.
+
+        Args:
+            axis: int index or string parameter name
+            percentage: float between 0 and 100
+
+        Returns:
+            list of two floats, low and high
+        """
+        return self.Marginal(axis).CredibleInterval(percentage)
+
+    def Mode(self):
+        """Returns the combination of parameters with the highest prob.
+
+        Returns:
+            tuple of floats, one per parameter
+        """
+        index = numpy.unravel_index(self.ps.argmax(), self.ps.shape)
+        return tuple(axis[i].item() for axis, i in zip(self.axes, index))
+
+
+def MakeAdaptiveSuite(low, high, evidence, log_likelihood, steps=33,
+                      percentage=90, tol=0.001, eps=1e-6, max_rounds=20,
+                      name=''):
+    """Makes a posterior Suite on a grid that adapts to the evidence.
+
+    Starts with a coarse grid of hypotheses from low to high with a
+    uniform prior.  After each round, makes a new grid that spans only
+    the range holding all but eps of the posterior probability; when
+    that range does not shrink by much, uses twice as many steps
+    instead.  Stops when the credible interval, interpolated between
+    hypotheses, changes by less than tol times its width, or after
+    max_rounds.
+
+    The result approximates the posterior computed on a fine uniform
+    grid from low to high, with far fewer likelihood evaluations.
+
+    Assumes the posterior is unimodal.  A narrow second mode that
+    falls between the hypotheses of a coarse grid can get almost no
+    probability there, and then it is silently cut out of the range.
+
+    Args:
+        low: low end of range
+        high: high end of range
+        evidence: whatever kind of object log_likelihood expects
+        log_likelihood: function that takes the evidence and an array of
+                        hypotheses and returns an array of log
+                        likelihoods
+        steps: number of hypotheses in the first grid
+        percentage: which credible interval to check, between 0 and 100
+        tol: how much the interval may change, relative to its width,
+             before the grid is considered fine enough
+        eps: how much probability a new grid may leave out
+        max_rounds: the largest number of grids to try
+
+    Returns:
+        Suite object
+    """
+    interval = None
+    for _ in range(max_rounds):
+        suite = MakeUniformSuite(low, high, steps, name)
+        suite.LogUpdate(evidence, log_likelihood)
+
+        prev, interval = interval, _Interval(suite, percentage)
+        if prev is not None:
+            width = interval[1] - interval[0]
+            change = max(abs(interval[0] - prev[0]),
+                         abs(interval[1] - prev[1]))
+            if change <= tol * width:
+                break
+
+        # find the range that holds all but eps of the probability,
+        # with one more hypothesis on each side
+        cs = suite.ps.cumsum()
+        n = len(suite.xs)
+        i = max(cs.searchsorted(eps / 2) - 1, 0)
+        j = min(cs.searchsorted(1 - eps / 2) + 1, n - 1)
+        new_low, new_high = suite.xs[i], suite.xs[j]
+
+        if new_high - new_low > (high - low) / 2:
+            steps = 2 * steps - 1
+        low, high = new_low, new_high
+
+    return suite
+
+
+def _Interval(suite, percentage):
+    """Computes a credible interval, interpolating between hypotheses.
+
+    Treats each hypothesis on an evenly spaced grid as the middle of a
+    cell that holds its probability, and interpolates the CDF linearly
+    between the cell boundaries.  The cells at the ends stop at the
+    first and last hypotheses.
+
+    Returns:
+        array of two floats, low and high
+    """
+    prob = (1 - percentage / 100.0) / 2
+    xs = suite.xs
+    bounds = numpy.concatenate([xs[:1], (xs[1:] + xs[:-1]) / 2.0, xs[-1:]])
+    cs = numpy.append(0.0, suite.ps.cumsum())
+    return numpy.interp([prob, 1 - prob], cs, bounds)
+
+
+def MakeUniformSuite(low, high, steps, name=''):
+    """Makes a Suite of evenly spaced hypotheses with equal probability.
+
+    Args:
+        low: low end of range
+        high: high end of range
+        steps: number of values
+        name: string name for the Suite
+
+    Returns:
+        Suite object
+    """
+    suite = Suite(name=name)
+    hypos = numpy.linspace(low, high, steps)
+    suite.SetArrays(hypos, numpy.ones(steps) / steps)
+    return suite
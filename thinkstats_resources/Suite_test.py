@@ -0,0 +1,203 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2010 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+import unittest
+
+import numpy
+import Pmf
+import Suite
+
+
+def TrainLikelihood(evidence, hypos):
+    return numpy.where(evidence > hypos, 0.0, 1.0 / hypos)
+
+
+class Test(unittest.TestCase):
+
+    def testMakeUniformSuite(self):
+        suite = Suite.MakeUniformSuite(1, 5, 5, name='prior')
+        self.assertEquals(suite.Values(), [1, 2, 3, 4, 5])
+        self.assertAlmostEquals(suite.Prob(3), 0.2)
+        self.assertAlmostEquals(suite.Total(), 1)
+        self.assertEquals(suite.name, 'prior')
+
+    def testUpdate(self):
+        prior = Suite.MakeUniformSuite(1, 200, 200)
+        posterior = prior.Copy('posterior')
+        self.assertTrue(isinstance(posterior, Suite.Suite))
+        posterior.Update(60, TrainLikelihood)
+
+        # the prior is unchanged
+        self.assertAlmostEquals(prior.Prob(10), 1 / 200.0)
+        self.assertEquals(posterior.name, 'posterior')
+
+        # compare to an update one hypothesis at a time
+        pmf = Pmf.MakePmfFromList(range(1, 201))
+        for hypo in pmf.Values():
+            pmf.Mult(hypo, TrainLikelihood(60, hypo))
+        pmf.Normalize()
+
+        for hypo, prob in pmf.Items():
+            self.assertAlmostEquals(posterior.Prob(hypo), prob)
+        self.assertAlmostEquals(posterior.Mean(), pmf.Mean())
+
+    def testLogUpdate(self):
+        def LogLikelihood(evidence, hypos):
+            heads, tails = evidence
+            return heads * numpy.log(hypos) + tails * numpy.log1p(-hypos)
+
+        def Likelihood(evidence, hypos):
+            return numpy.exp(LogLikelihood(evidence, hypos))
+
+        suite = Suite.MakeUniformSuite(0.01, 0.99, 99)
+        log_suite = suite.Copy()
+        suite.Update((140, 110), Likelihood)
+        log_suite.LogUpdate((140, 110), LogLikelihood)
+        for p1, p2 in zip(suite.ps, log_suite.ps):
+            self.assertAlmostEquals(p1, p2)
+
+        # thousands of tosses underflow without logs
+        suite = Suite.MakeUniformSuite(0.01, 0.99, 99)
+        self.assertRaises(ValueError, suite.Update, (1400, 1100), Likelihood)
+        suite = Suite.MakeUniformSuite(0.01, 0.99, 99)
+        suite.LogUpdate((14000, 11000), LogLikelihood)
+        self.assertAlmostEquals(suite.Total(), 1)
+        self.assertAlmostEquals(suite.Mean(), 0.56, places=2)
+
+        # impossible evidence
+        self.assertRaises(ValueError, suite.LogUpdate, 60,
+                          lambda evidence, hypos: hypos * -numpy.inf)
+
+    def testLogUpdateSet(self):
+        def LogLikelihood(dataset, hypos):
+            xs = numpy.asarray(dataset)[:, numpy.newaxis]
+            return (numpy.log(hypos) - hypos * xs).sum(axis=0)
+
+        sample = numpy.random.RandomState(19).exponential(1 / 1.2, 10000)
+        suite = Suite.MakeUniformSuite(0.5, 1.5, 1000)
+        batched = suite.Copy()
+        suite.LogUpdate(sample, LogLikelihood)
+        batched.LogUpdateSet(sample, LogLikelihood, batch_size=300)
+        for p1, p2 in zip(suite.ps, batched.ps):
+            self.assertAlmostEquals(p1, p2)
+        self.assertAlmostEquals(suite.Mean(), 1 / sample.mean(), places=2)
+
+    def testLogPosterior(self):
+        def LogLikelihood(dataset, hypos):
+            xs = numpy.asarray(dataset)[:, numpy.newaxis]
+            return (numpy.log(hypos) - hypos * xs).sum(axis=0)
+
+        sample = numpy.random.RandomState(20).exponential(1 / 1.2, 5000)
+        prior = Suite.MakeUniformSuite(0.5, 1.5, 1000, name='prior')
+        stream = Suite.LogPosterior(prior)
+
+        # one value at a time, then in batches
+        for x in sample[:10]:
+            stream.Update([x], LogLikelihood)
+        post10 = stream.Snapshot('post10')
+        stream.UpdateSet(sample[10:], LogLikelihood, batch_size=128)
+        post5000 = stream.Snapshot()
+
+        self.assertEquals(post10.name, 'post10')
+        self.assertEquals(post5000.name, 'prior')
+        self.assertAlmostEquals(prior.ps.min(), 0.001)
+
+        for n, snapshot in [(10, post10), (5000, post5000)]:
+            suite = prior.Copy()
+            suite.LogUpdate(sample[:n], LogLikelihood)
+            for p1, p2 in zip(suite.ps, snapshot.ps):
+                self.assertAlmostEquals(p1, p2)
+
+    def testCredibleInterval(self):
+        suite = Suite.MakeUniformSuite(1, 200, 200)
+        suite.Update(60, TrainLikelihood)
+        self.assertEquals(suite.CredibleInterval(90), [63, 189])
+
+        cdf = suite.MakeCdf()
+        self.assertAlmostEquals(cdf.Prob(200), 1)
+        self.assertEquals(cdf.Prob(59), 0)
+
+    def testMakeAdaptiveSuite(self):
+        def LogLikelihood(dataset, hypos):
+            xs = numpy.asarray(dataset)[:, numpy.newaxis]
+            return (numpy.log(hypos) - hypos * xs).sum(axis=0)
+
+        calls = []
+        def CountingLikelihood(dataset, hypos):
+            calls.append(len(hypos))
+            return LogLikelihood(dataset, hypos)
+
+        sample = numpy.random.RandomState(21).exponential(1 / 1.2, 10000)
+        suite = Suite.MakeAdaptiveSuite(0.5, 1.5, sample, CountingLikelihood,
+                                        name='adaptive')
+        self.assertEquals(suite.name, 'adaptive')
+        self.assertAlmostEquals(suite.Total(), 1)
+
+        fine = Suite.MakeUniformSuite(0.5, 1.5, 100001)
+        fine.LogUpdateSet(sample, LogLikelihood, batch_size=10)
+        self.assertAlmostEquals(suite.Mean(), fine.Mean(), places=6)
+
+        # the interval on the adaptive grid is within one step of the
+        # interval on the fine grid
+        low, high = suite.CredibleInterval(90)
+        fine_low, fine_high = fine.CredibleInterval(90)
+        step = suite.xs[1] - suite.xs[0]
+        self.assertTrue(abs(low - fine_low) <= step)
+        self.assertTrue(abs(high - fine_high) <= step)
+        self.assertTrue(step < (high - low) / 20)
+        self.assertTrue(sum(calls) < 500)
+
+    def testJointSuite(self):
+        def LogLikelihood(dataset, mus, sigmas):
+            xs = numpy.asarray(dataset).reshape(-1, 1, 1)
+            zs = (xs - mus) / sigmas
+            return (-numpy.log(sigmas) - zs**2 / 2).sum(axis=0)
+
+        sample = numpy.random.RandomState(22).normal(39, 2.5, 1000)
+        mus = numpy.linspace(38, 40, 41)
+        sigmas = numpy.linspace(2, 3, 21)
+        suite = Suite.JointSuite([mus, sigmas], ['mu', 'sigma'], 'prglength')
+        self.assertEquals(suite.ps.shape, (41, 21))
+        self.assertAlmostEquals(suite.ps.sum(), 1)
+
+        prior = suite.Copy()
+        suite.LogUpdateSet(sample, LogLikelihood, batch_size=64)
+        self.assertAlmostEquals(prior.ps[0, 0], 1 / 861.0)
+
+        # compare to an update one pair of hypotheses at a time
+        logps = numpy.empty((41, 21))
+        for i, mu in enumerate(mus):
+            for j, sigma in enumerate(sigmas):
+                logps[i, j] = LogLikelihood(sample, mu, sigma)
+        ps = numpy.exp(logps - logps.max())
+        ps /= ps.sum()
+        self.assertTrue(numpy.allclose(suite.ps, ps))
+
+        marginal = suite.Marginal('sigma')
+        self.assertTrue(isinstance(marginal, Suite.Suite))
+        self.assertEquals(marginal.name, 'sigma')
+        self.assertTrue(numpy.allclose(marginal.ps, ps.sum(axis=0)))
+        self.assertAlmostEquals(suite.Mean(0), mus.dot(ps.sum(axis=1)))
+        self.assertAlmostEquals(suite.Mean('mu'), sample.mean(), places=2)
+
+        low, high = suite.CredibleInterval('mu', 90)
+        self.assertTrue(low < sample.mean() < high)
+        self.assertEquals(suite.CredibleInterval(1),
+                          marginal.CredibleInterval())
+
+        i, j = numpy.unravel_index(ps.argmax(), ps.shape)
+        self.assertEquals(suite.Mode(), (mus[i], sigmas[j]))
+
+        # a likelihood that depends on only one parameter broadcasts
+        suite.Update(None, lambda evidence, mus, sigmas: mus > 39)
+        self.assertEquals(suite.ps[mus <= 39].sum(), 0)
+        self.assertAlmostEquals(suite.ps.sum(), 1)
+        self.assertRaises(ValueError, Suite.JointSuite, [mus, sigmas], ['mu'])
+
+
+if __name__ == "__main__":
+    unittest.main()
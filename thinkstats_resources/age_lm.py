@@ -89,20 +89,15 @@ F-statistic: 20.32 on 3 and 9080 DF,  p-value: 4.039e-13
 ## 50% of this effect is explained by mother's age, but the other
 ## half looks like it is legit.
 
-Note: this analysis uses the lm (linear model) function provided by
-rpy2, which is the Python interface to the R statistical software
-system.  You can read about R at  http://rpy.sourceforge.net/
-
-If you are running Ubuntu, you can install R and rpy to by running
-
-sudo apt-get install python-rpy2
+Note: these results came from the lm (linear model) function in the R
+statistical software system, by way of rpy2.  RunModel now fits the
+models with regression.py, which computes the same statistics without
+R.
 
 """
 
-import rpy2.robjects as robjects
-r = robjects.r
-
 import agemodel
+import regression
 
 
 def GetAgeWeightFirst(table):
@@ -134,50 +129,46 @@ def GetAgeWeightFirst(table):
     return ages, weights, first_bool
 
 
-def RunModel(model, print_flag=True):
-    """Submits model to r.lm and returns the result."""
-    model = r(model)
-    res = r.lm(model)
+def RunModel(model, data, print_flag=True):
+    """Fits a model like R's lm and returns the result.
+
+    Args:
+        model: string formula like 'weights ~ first + ages'
+        data: map from variable name to sequence of values
+        print_flag: whether to print a summary
+
+    Returns:
+        regression.Regression object
+    """
+    res = regression.Fit(model, data)
     if print_flag:
         PrintSummary(res)
     return res
 
 
 def PrintSummary(res):
-    """Prints results from r.lm (just the parts we want)."""
-    flag = False
-    lines = r.summary(res)
-    lines = str(lines)
-
-    for line in lines.split('\n'):
-        # skip everything until we get to coefficients
-        if line.startswith('Coefficients'):
-            flag = True
-        if flag:
-            print line
+    """Prints the coefficients and fit statistics of a Regression."""
+    print res.Summary()
     print
 
 
-def main():
+def main(name, data_dir=''):
 
     # get the data
-    pool, firsts, others = agemodel.MakeTables()
+    pool, firsts, others = agemodel.MakeTables(data_dir, cache=True)
     ages, weights, first_bool = GetAgeWeightFirst(pool)
     ages2 = [age**2 for age in ages]
 
-    # put the data into the R environment
-    robjects.globalEnv['weights'] = robjects.FloatVector(weights)
-    robjects.globalEnv['ages'] = robjects.FloatVector(ages)
-    robjects.globalEnv['ages2'] = robjects.FloatVector(ages2)
-    robjects.globalEnv['first'] = robjects.FloatVector(first_bool)
+    data = dict(weights=weights, ages=ages, ages2=ages2, first=first_bool)
 
     # run the models
-    #RunModel('weights ~ first')
-    #RunModel('weights ~ ages')
-    #RunModel('weights ~ first + ages')
-    #RunModel('weights ~ ages + ages2')
-    RunModel('weights ~ first + ages + ages2')
+    #RunModel('weights ~ first', data)
+    #RunModel('weights ~ ages', data)
+    #RunModel('weights ~ first + ages', data)
+    #RunModel('weights ~ ages + ages2', data)
+    RunModel('weights ~ first + ages + ages2', data)
 
 
 if __name__ == '__main__':
-    main()
+    import sys
+    main(*sys.argv)
@@ -92,9 +92,14 @@ def Process(table, name):
     table.age_cdf = Cdf.MakeCdfFromList(table.ages, table.name)
 
 
-def MakeTables(data_dir):
-    """Reads survey data and returns a tuple of Tables"""
-    table, firsts, others = first.MakeTables(data_dir)
+def MakeTables(data_dir, cache=False):
+    """Reads survey data and returns a tuple of Tables
+
+    Args:
+        data_dir: string directory name
+        cache: whether to cache the pregnancy table; see first.MakeTables
+    """
+    table, firsts, others = first.MakeTables(data_dir, cache)
     pool = descriptive.PoolRecords(firsts, others)
 
     Process(pool, 'live births')
@@ -217,7 +222,7 @@ def ComputeLeastSquares(ages, weights):
 
 
 def main(name, data_dir=''):
-    pool, firsts, others = MakeTables(data_dir)
+    pool, firsts, others = MakeTables(data_dir, cache=True)
 
     # compute differences in mean age and weight
     age_diff = DifferenceInMeans(firsts, others, 'ages')
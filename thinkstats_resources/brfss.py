@@ -6,6 +6,7 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
 import math
+import numpy
 import sys
 import survey
 import thinkstats
@@ -108,6 +109,40 @@ class Respondents(survey.Table):
         print 'Mean change', thinkstats.Mean(changes)
         
     
+class ColumnRespondents(survey.ColumnTable, Respondents):
+    """Represents the respondent table as columns."""
+
+    def Recode(self):
+        """Recodes whole columns; see Respondents.Recode."""
+
+        def CleanWeight(field):
+            # weights reported in pounds become fractional kg, so the
+            # whole column is float, including the values that
+            # Respondents leaves as ints; the values are the same
+            weight = self.columns[field]
+            na = self.masks[field] | (weight == 7777) | (weight == 9999)
+            clean = numpy.where(weight < 1000, weight / 2.2,
+                                numpy.where((9000 < weight) & (weight < 9999),
+                                            weight - 9000, weight))
+            self.SetColumn(field, clean.astype(numpy.float64), na)
+
+        # recode wtkg2
+        if 'wtkg2' in self.columns:
+            wtkg2 = self.columns['wtkg2']
+            na = self.masks['wtkg2'] | (wtkg2 == 99999)
+            self.SetColumn('wtkg2', wtkg2 / 100.0, na)
+
+        # record wtyrago
+        for field in ['weight2', 'wtyrago']:
+            if field in self.columns:
+                CleanWeight(field)
+
+        # recode htm3
+        if 'htm3' in self.columns:
+            htm3 = self.columns['htm3']
+            self.masks['htm3'] = self.masks['htm3'] | (htm3 == 999)
+
+
 def main(name, data_dir=''):
     resp = Respondents()
     resp.ReadRecords(data_dir)
@@ -66,8 +66,24 @@ def ComputeCorrelations():
     print 'sqrt(R^2):', math.sqrt(R2)
 
 
+def ComputeCorrelationMatrices(data_dir='.'):
+    """Prints the correlations between pairs of BRFSS weight fields."""
+    resp = brfss.ColumnRespondents()
+    resp.ReadRecords(data_dir)
+
+    fields = ['weight2', 'wtyrago', 'wtkg2', 'htm3']
+    columns = [resp.GetColumn(field) for field in fields]
+
+    print 'Fields:', ' '.join(fields)
+    print 'Pearson correlations:'
+    print correlation.CorrMatrix(columns)
+    print 'Spearman correlations:'
+    print correlation.CorrMatrix(columns, rank=True, processes=None)
+
+
 def main(name):
     ComputeCorrelations()
+    ComputeCorrelationMatrices()
 
 
 if __name__ == '__main__':
@@ -31,9 +31,7 @@ class Respondents(brfss.Respondents):
                 
         pyplot.clf()
         
-        t = weights[:]
-        t.sort()
-        mu, var = thinkstats.TrimmedMeanVar(t)
+        mu, var = thinkstats.TrimmedMeanVar(weights)
         print 'n, Mean, Var', len(weights), mu, var
         
         sigma = math.sqrt(var)
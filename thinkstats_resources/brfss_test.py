@@ -0,0 +1,60 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2010 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+import unittest
+
+import numpy
+import brfss
+import survey
+
+# raw values as they appear in the data file, with 'NA' where the
+# field could not be read
+RAW = {
+    'weight2': [150, 7777, 9999, 9070, 1500, 'NA', 220],
+    'wtyrago': [160, 9080, 7777, 'NA', 200, 9999, 9100],
+    'wtkg2': [6804, 99999, 'NA', 7000, 6804, 9979, 10000],
+    'htm3': [170, 999, 'NA', 180, 165, 175, 190],
+    'sex': [1, 2, 2, 1, 'NA', 2, 1],
+    }
+
+
+class Test(unittest.TestCase):
+
+    def testColumnRespondents(self):
+        n = len(RAW['sex'])
+
+        table = brfss.Respondents()
+        for i in range(n):
+            rec = survey.Respondent()
+            for field, values in RAW.iteritems():
+                setattr(rec, field, values[i])
+            table.AddRecord(rec)
+        table.Recode()
+
+        columns = brfss.ColumnRespondents()
+        for field, values in RAW.iteritems():
+            mask = numpy.array([x == 'NA' for x in values])
+            data = numpy.array([0 if x == 'NA' else x for x in values])
+            columns.SetColumn(field, data, mask)
+        columns.Recode()
+
+        # the cleaned weights are floats, with the same values
+        self.assertEquals(columns.columns['weight2'].dtype, numpy.float64)
+        self.assertEquals(columns.columns['wtyrago'].dtype, numpy.float64)
+
+        for r1, r2 in zip(table.records, columns.records):
+            for field in RAW:
+                x1 = getattr(r1, field)
+                x2 = getattr(r2, field)
+                if x1 == 'NA':
+                    self.assertEquals(x2, 'NA')
+                else:
+                    self.assertAlmostEquals(x1, x2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,10 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
 import descriptive
+import hypothesis
 import itertools
+import math
+import numpy
 import Pmf
 import random
 import risk
@@ -95,7 +98,90 @@ def ChiSquared(expected, observed):
     return sum(t)
 
 
-def Test(pool, firsts, others, num_trials=1000):
+def SimulateChiSquared(expected, ns, probs, num_trials=1000, seed=None):
+    """Generates random tables and computes their chi-squared statistics.
+
+    Each row of each table is drawn from a multinomial distribution
+    with the given probabilities, so every row adds up to its total.
+    The last probability is not used: the last cell gets 1 minus the
+    sum of the others, so if probs do not add up to 1 the difference
+    goes to the last cell.  (SimulateRow instead draws each cell from
+    its own binomial distribution and then adjusts the last count to
+    make the total.)  All trials for a row are drawn in a single call,
+    and the statistics for all trials are computed as one array
+    expression.
+
+    Args:
+      expected: row of rows of expected values
+      ns: sequence of row totals
+      probs: sequence of float probabilities, one per column
+      num_trials: how many tables to generate
+      seed: random seed; see thinkstats.RandomState
+
+    Returns:
+      array of num_trials chi-squared statistics
+    """
+    state = thinkstats.RandomState(seed)
+    expected = numpy.asarray(expected, dtype=numpy.float64)
+
+    # simulated has shape (num_trials, rows, cols)
+    rows = [state.multinomial(n, probs, size=num_trials) for n in ns]
+    simulated = numpy.array(rows).transpose(1, 0, 2)
+
+    chi2s = ((simulated - expected)**2 / expected).sum(axis=2).sum(axis=1)
+    return chi2s
+
+
+def ChiSquaredSf(x, df):
+    """Evaluates the survival function of the chi-squared distribution.
+
+    Uses the closed forms for integer degrees of freedom.
+
+    Args:
+      x: float chi-squared statistic
+      df: int degrees of freedom
+
+    Returns:
+      float probability of a value greater than x
+    """
+    x = float(x)
+    if x <= 0:
+        return 1.0
+
+    if df % 2 == 0:
+        # exp(-x/2) * sum of (x/2)**i / i! for i < df/2
+        term = total = 1.0
+        for i in range(1, df / 2):
+            term *= x / 2.0 / i
+            total += term
+        return math.exp(-x / 2.0) * total
+
+    # erfc(sqrt(x/2)) + sqrt(2/pi) exp(-x/2) *
+    # sum of x**(i-1/2) / (1 * 3 * ... * (2i-1)) for 1 <= i <= (df-1)/2
+    term = math.sqrt(x)
+    total = 0.0
+    for i in range(1, (df + 1) / 2):
+        total += term
+        term *= x / (2 * i + 1)
+    factor = math.sqrt(2 / math.pi) * math.exp(-x / 2.0)
+    return math.erfc(math.sqrt(x / 2.0)) + factor * total
+
+
+def Test(pool, firsts, others, num_trials=1000, seed=None, analytic=False):
+    """Estimates the p-value of the chi-squared statistic by simulation.
+
+    Args:
+      pool: table of all live births
+      firsts: table of first babies
+      others: table of other babies
+      num_trials: how many random tables to simulate
+      seed: random seed; see thinkstats.RandomState
+      analytic: whether to also print the p-value from the chi-squared
+                distribution
+
+    Returns:
+      float p-value
+    """
     # collect the functions from risk.py that take Pmfs and compute
     # various probabilities
     funcs = [risk.ProbEarly, risk.ProbOnTime, risk.ProbLate]
@@ -118,30 +204,58 @@ def Test(pool, firsts, others, num_trials=1000):
     print threshold
 
     print 'simulated %d trials' % num_trials
-    chi2s = []
-    count = 0
-    for _ in range(num_trials):
-        simulated = ComputeRows(firsts, others, funcs, probs=probs, 
-                            row_func=SimulateRow)
-        chi2 = ChiSquared(expected, simulated)
-        chi2s.append(chi2)
-        if chi2 >= threshold:
-            count += 1
+    ns = [len(table) for table in tables]
+    chi2s = SimulateChiSquared(expected, ns, probs, num_trials, seed)
+    count = (chi2s >= threshold).sum()
             
     print 'max chi2'
-    print max(chi2s)
+    print chi2s.max()
     
     pvalue = 1.0 * count / num_trials
     print 'p-value'
     print pvalue
 
+    if analytic:
+        # the simulated rows are drawn from the pooled probabilities,
+        # not conditioned on the column totals as in a contingency
+        # table, so each row has len(probs) - 1 degrees of freedom
+        df = len(expected) * (len(probs) - 1)
+        print 'analytic p-value (%d degrees of freedom)' % df
+        print ChiSquaredSf(threshold, df)
+
     return pvalue
 
 
+def ResampleTest(pool, firsts, others, iters=1000, seed=None):
+    """Tests chi-squared along with other statistics by resampling.
+
+    Draws the groups from the pooled lengths and computes all of the
+    statistics from the same resamples; see hypothesis.ResampleStats.
+
+    Args:
+      pool: table of all live births
+      firsts: table of first babies
+      others: table of other babies
+      iters: how many resamples
+      seed: random seed; see thinkstats.RandomState
+
+    Returns:
+      list of p-values, one per statistic
+    """
+    # the bins used by risk.ProbEarly, risk.ProbOnTime and risk.ProbLate
+    stats = [hypothesis.MakeChiSquared([38, 41]),
+             hypothesis.DiffMeans,
+             hypothesis.DiffTrimmedMeans,
+             hypothesis.LogVarRatio]
+    return hypothesis.TestStats(firsts.lengths, others.lengths, stats,
+                                pool.lengths, iters, seed=seed)
+
+
 def main():
     # get the data
     pool, firsts, others = descriptive.MakeTables()
     Test(pool, firsts, others, num_trials=1000)
+    ResampleTest(pool, firsts, others, iters=1000)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2010 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+import unittest
+
+import numpy
+import chi
+
+
+class Test(unittest.TestCase):
+
+    def testChiSquaredSf(self):
+        # values from scipy.stats.chi2.sf
+        table = {
+            1: [0.4795001222, 0.0500435212, 0.0015654023],
+            2: [0.7788007831, 0.1466069621, 0.0067379470],
+            3: [0.9188914117, 0.2792676171, 0.0185661355],
+            4: [0.9735009788, 0.4280923294, 0.0404276820],
+            5: [0.9921232932, 0.5726744598, 0.0752352461],
+            6: [0.9978385033, 0.6983182820, 0.1246520195],
+            }
+        for df, ps in table.iteritems():
+            for x, p in zip([0.5, 3.84, 10.0], ps):
+                self.assertAlmostEquals(chi.ChiSquaredSf(x, df), p, places=9)
+
+        # integer statistics give the same answer
+        self.assertAlmostEquals(chi.ChiSquaredSf(3, 7), 0.8850022316,
+                                places=9)
+        self.assertEquals(chi.ChiSquaredSf(3, 7), chi.ChiSquaredSf(3.0, 7))
+        self.assertEquals(chi.ChiSquaredSf(10, 4), chi.ChiSquaredSf(10.0, 4))
+
+        self.assertEquals(chi.ChiSquaredSf(0, 3), 1.0)
+        self.assertEquals(chi.ChiSquaredSf(-1, 4), 1.0)
+
+    def testSimulateChiSquared(self):
+        ns = [400, 600]
+        probs = [0.2, 0.5, 0.3]
+        expected = chi.ComputeRow(400, probs), chi.ComputeRow(600, probs)
+
+        chi2s = chi.SimulateChiSquared(expected, ns, probs, 5000, seed=12)
+        self.assertEquals(chi2s.shape, (5000,))
+        again = chi.SimulateChiSquared(expected, ns, probs, 5000, seed=12)
+        self.assertTrue(numpy.array_equal(chi2s, again))
+
+        # each statistic is ChiSquared of one simulated table
+        state = numpy.random.RandomState(12)
+        rows = [state.multinomial(n, probs, size=5000) for n in ns]
+        for i in [0, 1, 4999]:
+            table = [rows[0][i], rows[1][i]]
+            self.assertAlmostEquals(chi2s[i], chi.ChiSquared(expected, table))
+
+        # with fixed expected values, each row has 2 degrees of freedom,
+        # so the statistics are close to chi-squared with df=4
+        self.assertAlmostEquals(chi2s.mean(), 4, places=0)
+        pvalue = (chi2s > 9.49).mean()
+        self.assertAlmostEquals(pvalue, chi.ChiSquaredSf(9.49, 4), places=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
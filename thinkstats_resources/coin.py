@@ -6,8 +6,8 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
 import myplot
-import Pmf
-from math import pow
+import Suite
+import thinkstats
 
 """This file contains a partial solution to a problem from
 MacKay, "Information Theory, Inference, and Learning Algorithms."
@@ -28,65 +28,42 @@ We will get to that question, but we will start by defining a distribution
 of possible values for p, the probability of heads, and computing the
 posterior distribution of p given the evidence cited.
 
-The code below uses a Pmf object to represent a suite of hypotheses.
-In this case, the values in the Pmf are possible values of p, but in
-general we could use any kind of object to represent a hypothesis.
+The code below uses a Suite object to represent a suite of hypotheses.
+In this case, the values in the Suite are possible values of p.
 
 """
 
     
-def MakeUniformSuite(low, high, steps):
-    """Makes a PMF that represents a suite of hypotheses with equal p.
-    
+def Likelihood(evidence, hypos):
+    """Computes the likelihood of the evidence under each hypothesis.
+
     Args:
-        low: low end of range
-        high: high end of range
-        steps: number of values
+        evidence: a tuple of (number of heads, number of tails)
+        hypos: float probability of heads, or array of them
 
     Returns:
-        Pmf object
+        probability of tossing the given number of heads and tails, in
+        any order, with a coin that has p probability of heads, for
+        each p in hypos
     """
-    hypos = [low + (high-low) * i / (steps-1.0) for i in range(steps)]
-    pmf = Pmf.MakePmfFromList(hypos)
-    return pmf
-
-def Update(suite, evidence):
-    """Updates a suite of hypotheses based on new evidence.
-
-    Modifies the suite directly; if you want to keep the original, make
-    a copy.
-
-    Args:
-        suite: Pmf object
-        evidence: whatever kind of object Likelihood expects
-    """
-    for hypo in suite.Values():
-        likelihood = Likelihood(evidence, hypo)
-        print hypo, likelihood
-        suite.Mult(hypo, likelihood)
-    suite.Normalize()
-
-def Likelihood(evidence, hypo):
-    """Computes the likelihood of the evidence assuming the hypothesis is true.
+    heads, tails = evidence
+    p = hypos
+    return thinkstats.BinomialPmf(heads, heads + tails, p)
 
-    Args:
-        evidence: a tuple of (number of heads, number of tails)
-        hypo: float probability of heads
+def LogLikelihood(evidence, hypos):
+    """Computes the log likelihood of the evidence under each hypothesis.
 
-    Returns:
-        probability of tossing the given number of heads and tails with a
-        coin that has p probability of heads
+    See Likelihood.
     """
     heads, tails = evidence
-    p = hypo
-    return pow(p, heads) * pow(1-p, tails)
+    p = hypos
+    return thinkstats.LogBinomialPmf(heads, heads + tails, p)
 
 def main():
-    suite = MakeUniformSuite(0.0, 1.0, 11)
+    suite = Suite.MakeUniformSuite(0.0, 1.0, 11, name='posterior')
     evidence = 140, 110
 
-    Update(suite, evidence)
-    suite.name = 'posterior'
+    suite.LogUpdate(evidence, LogLikelihood)
 
     # plot the posterior distributions
     myplot.Pmf(suite, 
@@ -30,18 +30,15 @@ def IntegrateLikelihood(evidence, suite, step):
 
     Args:
       evidence: some representation of the evidence
-      suite: Pmf object that maps possible parameters to their probabilities
+      suite: Suite object that maps possible parameters to their
+             probabilities
       step: float step size between parameters in the suite
 
     Returns:
       float
     """
-    total = 0.0
-    for hypo in suite.Values():
-        likelihood = Likelihood(evidence, hypo)
-        total += likelihood * suite.Prob(hypo)
-
-    return total
+    likelihoods = Likelihood(evidence, suite.xs)
+    return likelihoods.dot(suite.ps)
 
 
 def main():
@@ -49,7 +46,7 @@ def main():
     low = 0.0
     high = 1.0
     step = (high-low) / (n-1)
-    suite = MakeUniformSuite(low, high, n)
+    suite = Suite.MakeUniformSuite(low, high, n)
     evidence = 140, 110
 
     likelihood_unbiased = Likelihood(evidence, 0.5)
@@ -5,7 +5,9 @@ Copyright 2010 Allen B. Downey
 License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
-import math
+import itertools
+import multiprocessing
+import numpy
 import thinkstats
 
 def Cov(xs, ys, mux=None, muy=None):
@@ -20,16 +22,20 @@ def Cov(xs, ys, mux=None, muy=None):
     Returns:
         Cov(X, Y)
     """
+    if mux is None and muy is None:
+        return thinkstats.CoMoments(xs, ys).Cov()
     if mux is None:
         mux = thinkstats.Mean(xs)
     if muy is None:
         muy = thinkstats.Mean(ys)
 
+    n = 0
     total = 0.0
-    for x, y in zip(xs, ys):
+    for x, y in itertools.izip(xs, ys):
+        n += 1
         total += (x-mux) * (y-muy)
 
-    return total / len(xs)
+    return total / n
 
 
 def Corr(xs, ys):
@@ -42,12 +48,7 @@ def Corr(xs, ys):
     Returns:
         Corr(X, Y)
     """
-    xbar, varx = thinkstats.MeanVar(xs)
-    ybar, vary = thinkstats.MeanVar(ys)
-
-    corr = Cov(xs, ys, xbar, ybar) / math.sqrt(varx * vary)
-
-    return corr
+    return thinkstats.CoMoments(xs, ys).Corr()
 
 
 def SpearmanCorr(xs, ys):
@@ -65,6 +66,146 @@ def SpearmanCorr(xs, ys):
     return Corr(xranks, yranks)
 
 
+def CorrMatrix(columns, rank=False, processes=1):
+    """Computes the correlations between every pair of columns.
+
+    Values that are 'NA' (or NaN, or masked) are skipped pair by pair:
+    each correlation uses the rows where both columns have values.
+
+    Each column is centered and scaled once; the sums each pair needs
+    over its common rows then come from a few matrix products.  For
+    Spearman's correlation, each column is ranked once; pairs whose
+    rows differ from the rows of the columns they come from have to be
+    ranked again, and those pairs can be split across processes.
+
+    Args:
+        columns: sequence of k sequences of n values, or MaskedArrays
+        rank: whether to compute Spearman's correlation instead of
+              Pearson's
+        processes: how many processes to rank pairs with; None means
+                   one per CPU
+
+    Returns:
+        k by k array of correlations
+    """
+    values, valid = MaskColumns(columns)
+    if rank:
+        return _SpearmanMatrix(values, valid, processes)
+    return _PearsonMatrix(values, valid)
+
+
+def SpearmanCorrMatrix(columns, processes=1):
+    """Computes Spearman's correlation for every pair of columns.
+
+    See CorrMatrix.
+    """
+    return CorrMatrix(columns, rank=True, processes=processes)
+
+
+def MaskColumns(columns):
+    """Stacks columns into an array, with a mask of the valid values.
+
+    Args:
+        columns: sequence of k sequences of n values, or MaskedArrays
+
+    Returns:
+        tuple of (n by k float array with 0 where values are missing,
+                  n by k boolean array, True where values are valid)
+    """
+    k = len(columns)
+    n = len(columns[0]) if k else 0
+    values = numpy.zeros((n, k))
+    valid = numpy.zeros((n, k), dtype=bool)
+
+    for j, column in enumerate(columns):
+        if len(column) != n:
+            raise ValueError('columns have different lengths')
+        if isinstance(column, numpy.ma.MaskedArray):
+            data = numpy.asarray(column.filled(0), dtype=numpy.float64)
+            ok = ~numpy.ma.getmaskarray(column)
+        else:
+            try:
+                data = numpy.asarray(column, dtype=numpy.float64)
+            except ValueError:
+                # strings like 'NA' mark missing values
+                data = numpy.array([numpy.nan if isinstance(x, basestring)
+                                    else x for x in column],
+                                   dtype=numpy.float64)
+            ok = numpy.ones(n, dtype=bool)
+        ok = ok & ~numpy.isnan(data)
+        values[ok, j] = data[ok]
+        valid[:, j] = ok
+
+    return values, valid
+
+
+def _PearsonMatrix(values, valid):
+    """Computes pairwise Pearson correlations; see CorrMatrix."""
+    mask = valid.astype(numpy.float64)
+    counts = mask.sum(axis=0)
+
+    # center and scale each column using its own valid values
+    means = values.sum(axis=0) / counts
+    z = (values - means) * mask
+    scales = numpy.sqrt((z * z).sum(axis=0) / counts)
+    z /= numpy.where(scales > 0, scales, 1)
+
+    # for each pair (i, j), sums over the rows where both are valid
+    n = mask.T.dot(mask)
+    sx = z.T.dot(mask)
+    sxy = z.T.dot(z)
+    sxx = (z * z).T.dot(mask)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        mx = sx / n
+        cov = sxy / n - mx * mx.T
+        var = sxx / n - mx * mx
+        corr = cov / numpy.sqrt(var * var.T)
+    return numpy.clip(corr, -1, 1)
+
+
+def _SpearmanMatrix(values, valid, processes=1):
+    """Computes pairwise Spearman correlations; see CorrMatrix."""
+    k = values.shape[1]
+    ranks = numpy.zeros_like(values)
+    for j in range(k):
+        ranks[valid[:, j], j] = MapToRanks(values[valid[:, j], j])
+    corr = _PearsonMatrix(ranks, valid)
+
+    # pairs with rows missing from only one column need new ranks
+    pairs = [(i, j) for i in range(k) for j in range(i + 1, k)
+             if (valid[:, i] != valid[:, j]).any()]
+    tasks = []
+    for i, j in pairs:
+        both = valid[:, i] & valid[:, j]
+        tasks.append((values[both, i], values[both, j]))
+
+    if processes == 1:
+        results = map(_SpearmanPair, tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_SpearmanPair, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    for (i, j), result in zip(pairs, results):
+        corr[i, j] = corr[j, i] = result
+    return corr
+
+
+def _SpearmanPair(args):
+    """Computes Spearman's correlation for a tuple of (xs, ys).
+
+    Takes a single tuple so it can be used with Pool.map.
+    """
+    xs, ys = args
+    if len(xs) < 2:
+        return numpy.nan
+    return SpearmanCorr(xs, ys)
+
+
 def LeastSquares(xs, ys):
     """Computes a linear least squares fit for ys as a function of xs.
 
@@ -75,11 +216,9 @@ def LeastSquares(xs, ys):
     Returns:
         tuple of (intercept, slope)
     """
-    xbar, varx = thinkstats.MeanVar(xs)
-    ybar, vary = thinkstats.MeanVar(ys)
-
-    slope = Cov(xs, ys, xbar, ybar) / varx
-    inter = ybar - slope * xbar
+    moments = thinkstats.CoMoments(xs, ys)
+    slope = moments.Cov() / moments.VarX()
+    inter = moments.meany - slope * moments.meanx
 
     return inter, slope
 
@@ -116,28 +255,35 @@ def CoefDetermination(ys, res):
 
 
 def MapToRanks(t):
-    """Returns a list of ranks corresponding to the elements in t.
+    """Returns the ranks corresponding to the elements in t.
+
+    Tied values get the average of the ranks they span.
 
     Args:
         t: sequence of numbers
     
     Returns:
-        list of integer ranks, starting at 1
+        array of float ranks, starting at 1
     """
-    # pair up each value with its index
-    pairs = enumerate(t)
-    
-    # sort by value
-    sorted_pairs = sorted(pairs, key=lambda pair: pair[1])
-
-    # pair up each pair with its rank
-    ranked = enumerate(sorted_pairs)
-
-    # sort by index
-    resorted = sorted(ranked, key=lambda trip: trip[1][0])
-
-    # extract the ranks
-    ranks = [trip[0]+1 for trip in resorted]
+    a = numpy.asarray(t)
+    n = len(a)
+    if n == 0:
+        return numpy.zeros(0)
+
+    # sort, and find where each run of equal values starts
+    order = numpy.argsort(a, kind='mergesort')
+    sorted_a = a[order]
+    starts = numpy.empty(n, dtype=bool)
+    starts[0] = True
+    starts[1:] = sorted_a[1:] != sorted_a[:-1]
+
+    # the average of ranks i+1 through j is (i + j + 1) / 2
+    first = numpy.flatnonzero(starts)
+    last = numpy.append(first[1:], n)
+    average = (first + last + 1) / 2.0
+
+    ranks = numpy.empty(n)
+    ranks[order] = average[starts.cumsum() - 1]
     return ranks
 
 
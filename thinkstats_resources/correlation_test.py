@@ -0,0 +1,102 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2010 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+import random
+import unittest
+
+import numpy
+import correlation
+
+
+class Test(unittest.TestCase):
+
+    def testMapToRanks(self):
+        ranks = correlation.MapToRanks([10, 30, 20, 20, 10, 20])
+        self.assertEquals(list(ranks), [1.5, 6, 4, 4, 1.5, 4])
+
+        self.assertEquals(list(correlation.MapToRanks([3, 1, 2])), [3, 1, 2])
+        self.assertEquals(list(correlation.MapToRanks([7, 7, 7])), [2, 2, 2])
+        self.assertEquals(len(correlation.MapToRanks([])), 0)
+
+    def testMapToRanksTies(self):
+        # compare to the average of the positions of each value in
+        # sorted order
+        random.seed(17)
+        t = [random.randint(0, 9) for i in range(500)]
+        ranks = correlation.MapToRanks(t)
+
+        s = sorted(t)
+        for x, rank in zip(t, ranks):
+            positions = [i + 1 for i, y in enumerate(s) if y == x]
+            self.assertEquals(rank, sum(positions) / float(len(positions)))
+
+    def makeColumns(self):
+        # four related columns, with missing values in different rows:
+        # 'NA' strings, NaNs, and a masked array
+        random.seed(18)
+        n = 200
+        xs = [random.gauss(0, 1) for i in range(n)]
+        ys = [x + random.gauss(0, 1) for x in xs]
+        zs = [random.randint(0, 5) for x in xs]
+        ws = [x * x + random.gauss(0, 0.5) for x in xs]
+
+        for i in random.sample(range(n), 20):
+            ys[i] = 'NA'
+        for i in random.sample(range(n), 30):
+            zs[i] = numpy.nan
+        mask = numpy.zeros(n, dtype=bool)
+        mask[random.sample(range(n), 25)] = True
+        ws = numpy.ma.masked_array(ws, mask)
+        return [xs, ys, zs, ws]
+
+    def commonRows(self, columns, i, j):
+        def Valid(column, k):
+            if isinstance(column, numpy.ma.MaskedArray):
+                return not column.mask[k]
+            x = column[k]
+            return x != 'NA' and x == x
+
+        rows = [k for k in range(len(columns[i]))
+                if Valid(columns[i], k) and Valid(columns[j], k)]
+        xs = [float(columns[i][k]) for k in rows]
+        ys = [float(columns[j][k]) for k in rows]
+        return xs, ys
+
+    def testMaskColumns(self):
+        columns = self.makeColumns()
+        values, valid = correlation.MaskColumns(columns)
+        self.assertEquals(values.shape, (200, 4))
+        self.assertEquals(list(valid.sum(axis=0)), [200, 180, 170, 175])
+        self.assertEquals(values[~valid].sum(), 0)
+        self.assertRaises(ValueError, correlation.MaskColumns,
+                          [[1, 2, 3], [1, 2]])
+
+    def testCorrMatrix(self):
+        columns = self.makeColumns()
+        corr = correlation.CorrMatrix(columns)
+        self.assertEquals(corr.shape, (4, 4))
+
+        for i in range(4):
+            for j in range(4):
+                xs, ys = self.commonRows(columns, i, j)
+                self.assertAlmostEquals(corr[i, j], correlation.Corr(xs, ys))
+
+    def testSpearmanCorrMatrix(self):
+        columns = self.makeColumns()
+        corr = correlation.SpearmanCorrMatrix(columns)
+        parallel = correlation.SpearmanCorrMatrix(columns, processes=2)
+        self.assertTrue(numpy.array_equal(corr, parallel))
+
+        for i in range(4):
+            for j in range(4):
+                xs, ys = self.commonRows(columns, i, j)
+                self.assertAlmostEquals(corr[i, j],
+                                        correlation.SpearmanCorr(xs, ys))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -34,9 +34,14 @@ def Process(table, name):
     table.weight_cdf = Cdf.MakeCdfFromList(table.weights, table.name)
 
 
-def MakeTables(data_dir):
-    """Reads survey data and returns a tuple of Tables"""
-    table, firsts, others = first.MakeTables(data_dir)
+def MakeTables(data_dir, cache=False):
+    """Reads survey data and returns a tuple of Tables
+
+    Args:
+        data_dir: string directory name
+        cache: whether to cache the pregnancy table; see first.MakeTables
+    """
+    table, firsts, others = first.MakeTables(data_dir, cache)
     pool = descriptive.PoolRecords(firsts, others)
 
     Process(pool, 'live births')
@@ -102,7 +107,7 @@ def MakeFigures(pool, firsts, others):
 def main(name, data_dir=''):
     MakeExample()
 
-    pool, firsts, others = MakeTables(data_dir)
+    pool, firsts, others = MakeTables(data_dir, cache=True)
     MakeFigures(pool, firsts, others)
     
 
@@ -6,11 +6,10 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
 import myplot
-import Pmf
+import numpy
+import Suite
 import thinkstats
 
-from math import exp
-
 """This file contains a partial solution to a problem from
 MacKay, "Information Theory, Inference, and Learning Algorithms."
 
@@ -23,61 +22,43 @@ cm.  What is $\lambda$?
 
 """
 
-def MakeUniformSuite(low, high, steps):
-    """Makes a PMF that represents a suite of hypotheses with equal p.
-    
+def LogLikelihood(evidence, hypos):
+    """Computes the log likelihood of the evidence under each hypothesis.
+
     Args:
-        low: low end of range
-        high: high end of range
-        steps: number of values
+        evidence: sequence of measurements
+        hypos: array of parameters of the expo distribution
 
     Returns:
-        Pmf object
+        array of log probabilities of the evidence under the hypotheses
     """
-    hypos = [low + (high-low) * i / (steps-1.0) for i in range(steps)]
-    pmf = Pmf.MakePmfFromList(hypos)
-    return pmf
-
-
-def Update(suite, evidence):
-    """Updates a suite of hypotheses based on new evidence.
-
-    Modifies the suite directly; if you want to keep the original, make
-    a copy.
+    xs = numpy.asarray(evidence, dtype=numpy.float64)
+    densities = LogExpoCondPdf(xs[:, numpy.newaxis], hypos)
+    return densities.sum(axis=0)
 
-    Args:
-        suite: Pmf object
-        evidence: whatever kind of object Likelihood expects
-    """
-    for hypo in suite.Values():
-        likelihood = Likelihood(evidence, hypo)
-        suite.Mult(hypo, likelihood)
-    suite.Normalize()
 
+def ExpoCondPdf(x, param, low=1.0, high=20.0):
+    """Evaluates the conditional exponential PDF.
 
-def Likelihood(evidence, hypo):
-    """Computes the likelihood of the evidence assuming the hypothesis is true.
+    Returns the probability density of x in the exponential PDF
+    with the given parameter, with the condition that low < x < high.
+    Works with arrays.
 
     Args:
-        evidence: sequence of measurements
-        hypo: parameter of the expo distribution
-
-    Returns:
-        probability of the evidence under the hypothesis
+      x: float observed value
+      param: float parameter of the exponential distribution
+      low: float, low end of the observable range
+      high: float, high end of the observable range
     """
-    param = hypo
-    likelihood = 1
-    for x in evidence:
-        likelihood *= ExpoCondPdf(x, param)
-
-    return likelihood
+    return numpy.exp(LogExpoCondPdf(x, param, low, high))
 
 
-def ExpoCondPdf(x, param, low=1.0, high=20.0):
-    """Evaluates the conditional exponential PDF.
+def LogExpoCondPdf(x, param, low=1.0, high=20.0):
+    """Evaluates the log of the conditional exponential PDF.
 
-    Returns the probability density of x in the exponential PDF
+    Returns the log probability density of x in the exponential PDF
     with the given parameter, with the condition that low < x < high.
+    Works with arrays.
 
     Args:
       x: float observed value
@@ -85,17 +66,15 @@ def ExpoCondPdf(x, param, low=1.0, high=20.0):
       low: float, low end of the observable range
       high: float, high end of the observable range
     """
-    factor = exp(-low * param) - exp(-high * param)
-    p = param * exp(-param * x) / factor
-    return p
+    factor = numpy.exp(-low * param) - numpy.exp(-high * param)
+    return numpy.log(param) - param * x - numpy.log(factor)
 
 
 def main():
-    suite = MakeUniformSuite(0.001, 1.5, 1000)
+    suite = Suite.MakeUniformSuite(0.001, 1.5, 1000, name='posterior')
     evidence = [1.5, 2, 3, 4, 5, 12]
 
-    Update(suite, evidence)
-    suite.name = 'posterior'
+    suite.LogUpdate(evidence, LogLikelihood)
 
     # plot the posterior distributions
     myplot.Pmf(suite, 
@@ -107,5 +86,10 @@ def main():
     print 'Naive parameter estimate:', 1.0 / thinkstats.Mean(evidence)
     print 'Mean of the posterior distribution:', suite.Mean()
 
+    # the adaptive grid gets the same answer with fewer evaluations
+    adaptive = Suite.MakeAdaptiveSuite(0.001, 1.5, evidence, LogLikelihood)
+    print 'Mean on an adaptive grid of %d hypotheses:' % len(adaptive.xs),
+    print adaptive.Mean()
+
 if __name__ == '__main__':
     main()
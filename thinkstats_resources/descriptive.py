@@ -44,9 +44,14 @@ def PoolRecords(*tables):
     return pool
 
 
-def MakeTables(data_dir):
-    """Reads survey data and returns a tuple of Tables"""
-    table, firsts, others = first.MakeTables(data_dir)
+def MakeTables(data_dir, cache=False):
+    """Reads survey data and returns a tuple of Tables
+
+    Args:
+        data_dir: string directory name
+        cache: whether to cache the pregnancy table; see first.MakeTables
+    """
+    table, firsts, others = first.MakeTables(data_dir, cache)
     pool = PoolRecords(firsts, others)
 
     Process(pool, 'live births')
@@ -140,7 +145,7 @@ def MakeDiffFigure(firsts, others):
 
 
 def main(name, data_dir=''):
-    pool, firsts, others = MakeTables(data_dir)
+    pool, firsts, others = MakeTables(data_dir, cache=True)
     Summarize(pool, firsts, others)
     MakeFigures(firsts, others)
     MakeDiffFigure(firsts, others)
@@ -6,100 +6,100 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 
 """
 
-import math
 import matplotlib.pyplot as pyplot
 import myplot
-import Pmf
+import numpy
 import random
-import thinkstats
+import Suite
 
 
-def MakeUniformSuite(low, high, steps):
-    """Makes a PMF that represents a suite of hypotheses with equal p.
-    
-    Args:
-        low: low end of range
-        high: high end of range
-        steps: number of values
-
-    Returns:
-        Pmf object
-    """
-    hypos = [low + (high-low) * i / (steps-1.0) for i in range(steps)]
-    pmf = Pmf.MakePmfFromList(hypos)
-    return pmf
-
-
-def Update(suite, evidence):
-    """Updates a suite of hypotheses based on new evidence.
-
-    Modifies the suite directly; if you want to keep the original, make
-    a copy.
-
-    Args:
-        suite: Pmf object
-        evidence: whatever kind of object Likelihood expects
-    """
-    for hypo in suite.Values():
-        likelihood = Likelihood(evidence, hypo)
-        suite.Mult(hypo, likelihood)
-    suite.Normalize()
-
-
-def Likelihood(evidence, hypo):
-    """Computes the likelihood of the evidence assuming the hypothesis is true.
+def LogLikelihood(evidence, hypos):
+    """Computes the log likelihood of the evidence under each hypothesis.
 
     Args:
         evidence: sequence of measurements
-        hypo: parameter of the expo distribution
+        hypos: array of parameters of the expo distribution
 
     Returns:
-        probability of the evidence under the hypothesis
+        array of log probabilities of the evidence under the hypotheses
     """
-    param = hypo
-    likelihood = 1
-    for x in evidence:
-        likelihood *= ExpoPdf(x, param)
-
-    return likelihood
+    xs = numpy.asarray(evidence, dtype=numpy.float64)
+    densities = LogExpoPdf(xs[:, numpy.newaxis], hypos)
+    return densities.sum(axis=0)
 
 
 def ExpoPdf(x, param):
     """Evaluates the exponential PDF.
 
     Returns the probability density of x in the exponential PDF
-    with the given parameter.
+    with the given parameter.  Works with arrays.
 
     Args:
       x: float observed value
       param: float parameter of the exponential distribution
     """
-    p = param * math.exp(-param * x)
+    p = param * numpy.exp(-param * x)
     return p
 
 
+def LogExpoPdf(x, param):
+    """Evaluates the log of the exponential PDF.
+
+    Returns the log probability density of x in the exponential PDF
+    with the given parameter.  Works with arrays.
+
+    Args:
+      x: float observed value
+      param: float parameter of the exponential distribution
+    """
+    return numpy.log(param) - param * x
+
+
 def EstimateParameter(prior, sample, name='posterior'):
     """Computes the posterior distribution for the parameter of an expo dist.
 
     Args:
-      prior: Pmf that maps values of lamdba to their prior prob
+      prior: Suite that maps values of lamdba to their prior prob
       sample: sequence of values drawn from expo dist
       name: string name for the posterior
 
     Returns:
-      new Pmf object with the posterior probabilities
+      new Suite object with the posterior probabilities
     """
-    posterior = prior.Copy()
-    posterior.name = name
-    Update(posterior, sample)
+    posterior = prior.Copy(name)
+    posterior.LogUpdateSet(sample, LogLikelihood)
     return posterior
 
 
+def EstimateParameters(prior, sample, ns):
+    """Computes posterior distributions for prefixes of a sample.
+
+    Makes one pass over the sample, updating a LogPosterior with the
+    values between one prefix and the next.
+
+    Args:
+      prior: Suite that maps values of lamdba to their prior prob
+      sample: sequence of values drawn from expo dist
+      ns: increasing sequence of prefix lengths
+
+    Returns:
+      list of Suite objects, one per prefix, named 'post<n>'
+    """
+    stream = Suite.LogPosterior(prior)
+    posteriors = []
+    start = 0
+    for n in ns:
+        stream.UpdateSet(sample[start:n], LogLikelihood)
+        posteriors.append(stream.Snapshot('post%d' % n))
+        start = n
+    return posteriors
+
+
 def main():
 
     # make a uniform prior
     param = 1.2
-    prior = MakeUniformSuite(0.5, 1.5, 1000)
+    prior = Suite.MakeUniformSuite(0.5, 1.5, 1000)
 
     # try out the sample in the book
     t = []
@@ -108,16 +108,11 @@ def main():
     posterior = EstimateParameter(prior, sample, name)
     t.append(posterior)
 
-    # try out a range of sample sizes
-    for n in [10, 20, 40]:
-
-        # generate a sample
-        sample = [random.expovariate(param) for _ in range(n)]
-        name = 'post%d' % n
-
-        # compute the posterior
-        posterior = EstimateParameter(prior, sample, name)
-        t.append(posterior)
+    # try out a range of sample sizes, using the first n values of
+    # one sample for each
+    ns = [10, 20, 40]
+    sample = [random.expovariate(param) for _ in range(max(ns))]
+    t.extend(EstimateParameters(prior, sample, ns))
 
     # plot the posterior distributions
     for i, posterior in enumerate(t):
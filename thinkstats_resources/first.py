@@ -43,10 +43,16 @@ def Process(table):
     table.mu = thinkstats.Mean(table.lengths)
 
 
-def MakeTables(data_dir):
-    """Reads survey data and returns tables for first babies and others."""
-    table = survey.Pregnancies()
-    table.ReadRecords(data_dir)
+def MakeTables(data_dir, cache=False):
+    """Reads survey data and returns tables for first babies and others.
+
+    Args:
+        data_dir: string directory name
+        cache: whether to cache the pregnancy table in data_dir; see
+               survey.ColumnTable.ReadRecords
+    """
+    table = survey.ColumnPregnancies()
+    table.ReadRecords(data_dir, cache=cache)
 
     firsts, others = PartitionRecords(table)
     
@@ -63,13 +69,17 @@ def ProcessTables(*tables):
         Process(table)
         
         
-def Summarize(data_dir):
+def Summarize(data_dir, cache=False):
     """Prints summary statistics for first babies and others.
     
+    Args:
+        data_dir: string directory name
+        cache: whether to cache the pregnancy table; see MakeTables
+
     Returns:
         tuple of Tables
     """
-    table, firsts, others = MakeTables(data_dir)
+    table, firsts, others = MakeTables(data_dir, cache)
     ProcessTables(firsts, others)
         
     print 'Number of first babies', firsts.n
@@ -85,7 +95,7 @@ def Summarize(data_dir):
 
 
 def main(name, data_dir='.'):
-    Summarize(data_dir)
+    Summarize(data_dir, cache=True)
     
 
 if __name__ == '__main__':
@@ -8,11 +8,17 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 import Cdf
 import cumulative
 import math
+import multiprocessing
 import myplot
+import numpy
 import random
 import thinkstats
 import matplotlib.pyplot as pyplot
 
+# number of sampled values ResampleDeltas draws at a time; this bounds
+# the memory used by each batch of resamples
+BATCH_VALUES = 2**22
+
 
 def RunTest(root,
             pool,
@@ -20,7 +26,10 @@ def RunTest(root,
             actual2, 
             iters=1000,
             trim=False,
-            partition=False):
+            partition=False,
+            processes=1,
+            method='bootstrap',
+            alpha=None):
     """Computes the distributions of delta under H0 and HA.
     
     Args:
@@ -31,11 +40,14 @@ def RunTest(root,
         iters: how many resamples
         trim: whether to trim the sequences
         partition: whether to cross-validate by partitioning the data
+        processes: how many processes to resample with
+        method: how to generate the distribution under H0, 'bootstrap'
+                to resample from pool or 'permutation' to shuffle
+                the group labels
+        alpha: if provided, stop the test under H0 early once the
+               p-value is clearly above or below alpha
     """
     if trim:
-        pool.sort()
-        actual1.sort()
-        actual2.sort()
         pool = thinkstats.Trim(pool)
         actual1 = thinkstats.Trim(actual1)
         actual2 = thinkstats.Trim(actual2)
@@ -53,12 +65,13 @@ def RunTest(root,
     # P(E|H0)
     peh0 = Test(root + '_deltas_cdf',
                 actual1, actual2, pool, pool,
-                iters, plot=True)
+                iters, plot=True, processes=processes,
+                method=method, alpha=alpha)
 
     # P(E|Ha)
     peha = Test(root + '_deltas_ha_cdf',
                actual1, actual2, model1, model2,
-               iters)
+               iters, processes=processes)
 
     prior = 0.5
     pe = prior*peha + (1-prior)*peh0
@@ -66,7 +79,8 @@ def RunTest(root,
     print 'Posterior', posterior
 
 
-def Test(root, actual1, actual2, model1, model2, iters=1000, plot=False):
+def Test(root, actual1, actual2, model1, model2, iters=1000, plot=False,
+         processes=1, method='bootstrap', alpha=None):
     """Estimates p-values based on differences in the mean.
     
     Args:
@@ -77,6 +91,12 @@ def Test(root, actual1, actual2, model1, model2, iters=1000, plot=False):
         model2: sequences of values from the hypothetical distributions
         iters: how many resamples
         plot: whether to plot the distribution of differences in the mean
+        processes: how many processes to resample with
+        method: 'bootstrap' to resample from the models, or
+                'permutation' to shuffle the labels of the actual values
+                (in which case the models are not used)
+        alpha: if provided, stop early once the p-value is clearly
+               above or below alpha
     """
     n = len(actual1)
     m = len(actual2)
@@ -84,7 +104,14 @@ def Test(root, actual1, actual2, model1, model2, iters=1000, plot=False):
     mu1, mu2, delta = DifferenceInMean(actual1, actual2)
     delta = abs(delta)
 
-    cdf, pvalue = PValue(model1, model2, n, m, delta, iters)
+    if method == 'bootstrap':
+        cdf, pvalue = PValue(model1, model2, n, m, delta, iters,
+                             processes=processes, alpha=alpha)
+    elif method == 'permutation':
+        cdf, pvalue = PermutationPValue(actual1, actual2, delta, iters,
+                                        alpha=alpha)
+    else:
+        raise ValueError('unknown method %s' % method)
     print 'n:', n
     print 'm:', m
     print 'mu1', mu1
@@ -114,7 +141,8 @@ def DifferenceInMean(actual1, actual2):
     return mu1, mu2, delta
 
 
-def PValue(model1, model2, n, m, delta, iters=1000, plot=False):
+def PValue(model1, model2, n, m, delta, iters=1000, plot=False,
+           seed=None, processes=1, alpha=None):
     """Computes the distribution of deltas with the model distributions.
 
     And the p-value of the observed delta.
@@ -127,8 +155,68 @@ def PValue(model1, model2, n, m, delta, iters=1000, plot=False):
         delta: the observed difference in the means
         iters: how many samples to generate
         plot: boolean, whether to generate plots
+        seed: random seed; see thinkstats.RandomState
+        processes: how many processes to resample with
+        alpha: if provided, stop early once the p-value is clearly
+               above or below alpha; see SequentialDeltas
+    """
+    if alpha is None:
+        deltas = ResampleDeltas(model1, model2, n, m, iters, seed, processes)
+        return DeltasPValue(deltas, delta)
+
+    t1 = numpy.asarray(model1, dtype=numpy.float64)
+    t2 = numpy.asarray(model2, dtype=numpy.float64)
+
+    def Draw(size, state):
+        return ResampleDeltaBatch((t1, t2, n, m, size, state.randint(2**31)))
+
+    batch_size = max(1, BATCH_VALUES / (n + m))
+    deltas = SequentialDeltas(Draw, delta, iters, alpha, seed, batch_size)
+    return DeltasPValue(deltas, delta)
+
+
+def PermutationPValue(actual1, actual2, delta, iters=1000, seed=None,
+                      alpha=None):
+    """Computes the p-value of delta by permuting the group labels.
+
+    Under the null hypothesis the labels are exchangeable, so each
+    resample splits the pooled values at random into groups of the
+    original sizes.
+
+    Args:
+        actual1:
+        actual2: sequences of observed values for groups 1 and 2
+        delta: the observed difference in the means
+        iters: how many permutations to generate
+        seed: random seed; see thinkstats.RandomState
+        alpha: if provided, stop early once the p-value is clearly
+               above or below alpha; see SequentialDeltas
+
+    Returns:
+        tuple of (Cdf of the permuted deltas, p-value)
+    """
+    pool = numpy.concatenate([numpy.asarray(actual1, dtype=numpy.float64),
+                              numpy.asarray(actual2, dtype=numpy.float64)])
+    n = len(actual1)
+
+    def Draw(size, state):
+        return PermuteDeltas(pool, n, size, state)
+
+    batch_size = max(1, BATCH_VALUES / len(pool))
+    deltas = SequentialDeltas(Draw, delta, iters, alpha, seed, batch_size)
+    return DeltasPValue(deltas, delta)
+
+
+def DeltasPValue(deltas, delta):
+    """Computes the p-value of delta in a distribution of deltas.
+
+    Args:
+        deltas: sequence of resampled differences in mean
+        delta: the observed difference in the means
+
+    Returns:
+        tuple of (Cdf of deltas, p-value)
     """
-    deltas = [Resample(model1, model2, n, m) for i in range(iters)]
     mean_var = thinkstats.MeanVar(deltas)
     print '(Mean, Var) of resampled deltas', mean_var
 
@@ -188,6 +276,404 @@ def Resample(t1, t2, n, m):
     return delta
 
 
+def ResampleDeltas(t1, t2, n, m, iters=1000, seed=None, processes=1):
+    """Draws many resamples and computes their differences in mean.
+
+    Equivalent to calling Resample iters times, but the indices for a
+    batch of resamples are drawn as one array and the means computed
+    along its rows.  Each batch gets its own seed from the given one,
+    so the result depends on the seed but not on the number of
+    processes.
+
+    Args:
+        t1: sequence of values
+        t2: sequence of values
+        n: size of the samples to draw from t1
+        m: size of the samples to draw from t2
+        iters: how many resamples
+        seed: random seed; see thinkstats.RandomState
+        processes: how many processes to use; None means one per CPU
+
+    Returns:
+        array of iters differences in mean
+    """
+    t1 = numpy.asarray(t1, dtype=numpy.float64)
+    t2 = numpy.asarray(t2, dtype=numpy.float64)
+
+    state = thinkstats.RandomState(seed)
+    batch = max(1, BATCH_VALUES / (n + m))
+    tasks = []
+    for start in range(0, iters, batch):
+        size = min(batch, iters - start)
+        tasks.append((t1, t2, n, m, size, state.randint(2**31)))
+
+    if processes == 1:
+        results = map(ResampleDeltaBatch, tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(ResampleDeltaBatch, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    if not results:
+        return numpy.array([])
+    return numpy.concatenate(results)
+
+
+def ResampleDeltaBatch(args):
+    """Computes the differences in mean for a batch of resamples.
+
+    Takes a single tuple so it can be used with Pool.map.
+
+    Args:
+        args: tuple of (t1, t2, n, m, iters, seed)
+
+    Returns:
+        array of iters differences in mean
+    """
+    t1, t2, n, m, iters, seed = args
+    state = numpy.random.RandomState(seed)
+    mu1 = SampleMeans(t1, n, iters, state)
+    mu2 = SampleMeans(t2, m, iters, state)
+    return mu1 - mu2
+
+
+def SampleMeans(t, n, iters, state):
+    """Computes the means of samples drawn with replacement.
+
+    When t has fewer distinct values than n, draws the number of times
+    each value is chosen from a multinomial distribution instead of
+    drawing n indices; the result has the same distribution.
+
+    Args:
+        t: array of values
+        n: size of each sample
+        iters: how many samples
+        state: numpy.random.RandomState
+
+    Returns:
+        array of iters means
+    """
+    t = numpy.asarray(t, dtype=numpy.float64)
+    xs, counts = numpy.unique(t, return_counts=True)
+    if len(xs) < n:
+        ps = counts / float(len(t))
+        chosen = state.multinomial(n, ps, size=iters)
+        return chosen.dot(xs) / n
+    return t[state.randint(len(t), size=(iters, n))].mean(axis=1)
+
+
+def PermuteDeltas(pool, n, iters, state):
+    """Computes the differences in mean for random splits of pool.
+
+    When pool has fewer distinct values than n, draws how many copies
+    of each value go into the first group from a hypergeometric
+    distribution, one value at a time, instead of shuffling all of the
+    values; the result has the same distribution.
+
+    Args:
+        pool: array of values
+        n: size of the first group; the rest form the second
+        iters: how many splits
+        state: numpy.random.RandomState
+
+    Returns:
+        array of iters differences in mean
+    """
+    m = len(pool) - n
+    xs, counts = numpy.unique(pool, return_counts=True)
+
+    if len(xs) < n:
+        sums = numpy.zeros(iters)
+        need = numpy.empty(iters, dtype=numpy.int64)
+        need.fill(n)
+        left = len(pool)
+        for x, count in zip(xs, counts):
+            left -= count
+            chosen = state.hypergeometric(count, left, numpy.maximum(need, 1))
+            chosen[need == 0] = 0
+            sums += chosen * x
+            need -= chosen
+    else:
+        keys = state.random_sample((iters, len(pool)))
+        index = numpy.argpartition(keys, n-1, axis=1)[:, :n]
+        sums = pool[index].sum(axis=1)
+
+    mu1 = sums / n
+    mu2 = (pool.sum() - sums) / m
+    return mu1 - mu2
+
+
+def SequentialDeltas(draw, delta, iters, alpha=None, seed=None,
+                     batch_size=1000, z=3.0):
+    """Generates resampled deltas in batches, optionally stopping early.
+
+    After each batch, computes a Wilson confidence interval for the
+    p-value of delta (the fraction of deltas in the tails).  If alpha
+    is provided, stops as soon as the interval is entirely above or
+    entirely below alpha.
+
+    Args:
+        draw: function that takes a batch size and a RandomState and
+              returns an array of deltas
+        delta: the observed difference in the means
+        iters: the maximum number of deltas
+        alpha: significance level, or None to draw all iters deltas
+        seed: random seed; see thinkstats.RandomState
+        batch_size: how many deltas to draw between checks
+        z: width of the confidence interval in standard errors
+
+    Returns:
+        array of deltas
+    """
+    state = thinkstats.RandomState(seed)
+    batches = []
+    count = 0
+    total = 0
+
+    while total < iters:
+        deltas = draw(min(batch_size, iters - total), state)
+        batches.append(deltas)
+        total += len(deltas)
+        count += ((deltas <= -delta) | (deltas > delta)).sum()
+
+        if alpha is not None:
+            low, high = WilsonInterval(count, total, z)
+            if high < alpha or low > alpha:
+                print 'Stopped after %d of %d resamples' % (total, iters)
+                break
+
+    if not batches:
+        return numpy.array([])
+    return numpy.concatenate(batches)
+
+
+def WilsonInterval(count, total, z=3.0):
+    """Computes the Wilson score interval for a binomial proportion.
+
+    Args:
+        count: number of successes
+        total: number of trials
+        z: width of the interval in standard errors
+
+    Returns:
+        tuple of (low, high)
+    """
+    p = float(count) / total
+    z2 = z * z
+    denom = 1 + z2 / total
+    center = (p + z2 / (2 * total)) / denom
+    half = z * math.sqrt(p * (1 - p) / total + z2 / (4 * total**2)) / denom
+    return center - half, center + half
+
+
+def ResampleStats(actual1, actual2, stats, model=None, iters=1000,
+                  method='bootstrap', seed=None):
+    """Computes the null distributions of several statistics at once.
+
+    Each resample is a pair of groups the same sizes as actual1 and
+    actual2; every statistic is computed from the same resamples, so
+    a batch of tests over the same groups costs one set of draws.
+
+    A statistic is a function that takes two arrays of shape
+    (iters, n) and (iters, m), one resample per row, and returns an
+    array of iters values; see DiffMeans, DiffTrimmedMeans, LogVarRatio
+    and MakeChiSquared.
+
+    The p-value of each statistic is the fraction of resampled values
+    in the tails, as in DeltasPValue: below -x or above x, where x is
+    the absolute value of the observed statistic.  For statistics that
+    are never negative, like chi-squared, that is the right tail.
+
+    Args:
+        actual1:
+        actual2: sequences of observed values for groups 1 and 2
+        stats: sequence of statistic functions
+        model: sequence of values from the hypothetical distribution;
+               defaults to the pooled actual values
+        iters: how many resamples
+        method: 'bootstrap' to resample from the model, or
+                'permutation' to shuffle the labels of the actual values
+                (in which case the model is not used)
+        seed: random seed; see thinkstats.RandomState
+
+    Returns:
+        list of (observed value, Cdf of resampled values, p-value)
+        tuples, one per statistic
+    """
+    if iters < 1:
+        raise ValueError('iters must be at least 1 to compute p-values')
+
+    actual1 = numpy.asarray(actual1, dtype=numpy.float64)
+    actual2 = numpy.asarray(actual2, dtype=numpy.float64)
+    n = len(actual1)
+    m = len(actual2)
+
+    pool = numpy.concatenate([actual1, actual2])
+    if model is not None:
+        model = numpy.asarray(model, dtype=numpy.float64)
+    else:
+        model = pool
+
+    if method == 'bootstrap':
+        def Draw(size, state):
+            sample1 = model[state.randint(len(model), size=(size, n))]
+            sample2 = model[state.randint(len(model), size=(size, m))]
+            return sample1, sample2
+    elif method == 'permutation':
+        def Draw(size, state):
+            keys = state.random_sample((size, n + m))
+            index = keys.argsort(axis=1)
+            return pool[index[:, :n]], pool[index[:, n:]]
+    else:
+        raise ValueError('unknown method %s' % method)
+
+    state = thinkstats.RandomState(seed)
+    batch_size = max(1, BATCH_VALUES / (n + m))
+    batches = [[] for stat in stats]
+    for start in range(0, iters, batch_size):
+        sample1, sample2 = Draw(min(batch_size, iters - start), state)
+        for stat, batch in zip(stats, batches):
+            batch.append(stat(sample1, sample2))
+
+    results = []
+    for stat, batch in zip(stats, batches):
+        observed = stat(actual1[numpy.newaxis], actual2[numpy.newaxis])[0]
+        values = numpy.concatenate(batch)
+        cdf = Cdf.MakeCdfFromList(values)
+        x = abs(observed)
+        pvalue = cdf.Prob(-x) + 1.0 - cdf.Prob(x)
+        results.append((observed, cdf, pvalue))
+    return results
+
+
+def TestStats(actual1, actual2, stats, model=None, iters=1000,
+              method='bootstrap', seed=None):
+    """Prints the p-values of several statistics; see ResampleStats.
+
+    Returns:
+        list of p-values, one per statistic
+    """
+    results = ResampleStats(actual1, actual2, stats, model, iters,
+                            method, seed)
+    pvalues = []
+    for stat, (observed, cdf, pvalue) in zip(stats, results):
+        print stat.__name__, observed, 'p-value', pvalue
+        pvalues.append(pvalue)
+    return pvalues
+
+
+def DiffMeans(sample1, sample2):
+    """Computes differences in mean for rows of resamples.
+
+    Args:
+        sample1: array of shape (iters, n)
+        sample2: array of shape (iters, m)
+
+    Returns:
+        array of iters differences in mean
+    """
+    return sample1.mean(axis=1) - sample2.mean(axis=1)
+
+
+def DiffTrimmedMeans(sample1, sample2, p=0.01):
+    """Computes differences in trimmed mean for rows of resamples.
+
+    Args:
+        sample1: array of shape (iters, n)
+        sample2: array of shape (iters, m)
+        p: fraction of values to trim off each end
+
+    Returns:
+        array of iters differences in trimmed mean
+    """
+    return TrimmedMeans(sample1, p) - TrimmedMeans(sample2, p)
+
+
+def TrimmedMeans(sample, p=0.01):
+    """Computes the trimmed mean of each row of an array.
+
+    Partitions each row around the cut points instead of sorting it.
+
+    Args:
+        sample: array of shape (iters, n)
+        p: fraction of values to trim off each end
+
+    Returns:
+        array of iters trimmed means
+    """
+    n = sample.shape[1]
+    k = int(p * n)
+    if k == 0:
+        return sample.mean(axis=1)
+    sample = numpy.partition(sample, [k, n-k-1], axis=1)
+    return sample[:, k:n-k].mean(axis=1)
+
+
+def LogVarRatio(sample1, sample2):
+    """Computes log ratios of variances for rows of resamples.
+
+    Uses the log of the ratio so that, like a difference, it is
+    centered at 0 when the groups have the same variance.
+
+    Args:
+        sample1: array of shape (iters, n)
+        sample2: array of shape (iters, m)
+
+    Returns:
+        array of iters log variance ratios
+    """
+    return numpy.log(sample1.var(axis=1) / sample2.var(axis=1))
+
+
+def MakeChiSquared(edges):
+    """Makes a statistic that compares the groups with chi-squared.
+
+    Each value goes in a bin according to the given edges; a value
+    equal to an edge goes in the bin above it.  The expected count in
+    each bin comes from the pooled resample, as in a contingency table.
+
+    Args:
+        edges: sorted sequence of bin boundaries
+
+    Returns:
+        statistic function; see ResampleStats
+    """
+    edges = numpy.asarray(edges)
+
+    def ChiSquared(sample1, sample2):
+        observed = numpy.array([BinCounts(sample1, edges),
+                                BinCounts(sample2, edges)])
+        rows = observed.sum(axis=2)[:, :, numpy.newaxis]
+        cols = observed.sum(axis=0)[numpy.newaxis]
+        expected = rows * cols / rows.sum(axis=0)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            terms = (observed - expected)**2 / expected
+        terms[expected == 0] = 0
+        return terms.sum(axis=2).sum(axis=0)
+
+    return ChiSquared
+
+
+def BinCounts(sample, edges):
+    """Counts the values in each row of an array that fall in each bin.
+
+    Args:
+        sample: array of shape (iters, n)
+        edges: sorted array of k bin boundaries
+
+    Returns:
+        float array of shape (iters, k+1)
+    """
+    bins = numpy.searchsorted(edges, sample, side='right')
+    counts = numpy.empty((len(sample), len(edges) + 1))
+    for i in range(len(edges) + 1):
+        counts[:, i] = (bins == i).sum(axis=1)
+    return counts
+
+
 def Partition(t, n):
     """Splits a sequence into two random partitions.
     
@@ -248,6 +734,11 @@ def main():
             trim=False,
             partition=False)
 
+    # test several statistics with one set of resamples
+    stats = [DiffMeans, DiffTrimmedMeans, LogVarRatio,
+             MakeChiSquared([38, 41])]
+    TestStats(firsts.lengths, others.lengths, stats, pool.lengths, iters=1000)
+
 
 if __name__ == "__main__":
     main()
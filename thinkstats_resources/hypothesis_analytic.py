@@ -51,10 +51,11 @@ def Test(actual1, actual2, model, iters=1000):
     print 'Tails:', left, right
     print 'P-value:', pvalue
 
-    # compare the mean and variance of resamples differences
-    deltas = [hypothesis.Resample(model, model, n, m) for i in range(iters)]
-    mean_var = thinkstats.MeanVar(deltas)
-    print '(Mean, Var) of resampled deltas', mean_var
+    # compare the mean and variance of resampled differences
+    [(_, cdf, resampled)] = hypothesis.ResampleStats(
+        actual1, actual2, [hypothesis.DiffMeans], model, iters)
+    print '(Mean, Var) of resampled deltas', (cdf.Mean(), cdf.Var())
+    print 'Resampled p-value:', resampled
 
     return pvalue
 
@@ -0,0 +1,231 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2010 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+import math
+import random
+import unittest
+
+import numpy
+import hypothesis
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        # group 1 has few distinct values, so SampleMeans uses the
+        # multinomial shortcut; group 2 has all distinct values
+        random.seed(5)
+        self.t1 = [random.randint(35, 43) for i in range(300)]
+        self.t2 = [random.gauss(39, 3) for i in range(50)]
+
+    def checkMeanVar(self, deltas, mu, var, tol=0.1):
+        # the mean within 4 standard errors, the variance within tol
+        se = math.sqrt(var / len(deltas))
+        self.assertTrue(abs(deltas.mean() - mu) < 4 * se)
+        self.assertTrue(abs(deltas.var() / var - 1) < tol)
+
+    def testResampleDeltas(self):
+        deltas = hypothesis.ResampleDeltas(self.t1, self.t2, 300, 50,
+                                           iters=2000, seed=3)
+        self.assertEquals(deltas.shape, (2000,))
+
+        again = hypothesis.ResampleDeltas(self.t1, self.t2, 300, 50,
+                                          iters=2000, seed=3)
+        self.assertTrue(numpy.array_equal(deltas, again))
+        other = hypothesis.ResampleDeltas(self.t1, self.t2, 300, 50,
+                                          iters=2000, seed=4)
+        self.assertFalse(numpy.array_equal(deltas, other))
+
+        empty = hypothesis.ResampleDeltas(self.t1, self.t2, 300, 50,
+                                          iters=0, seed=3)
+        self.assertEquals(len(empty), 0)
+
+        # compare to the expected mean and variance, and to Resample
+        mu = numpy.mean(self.t1) - numpy.mean(self.t2)
+        var = numpy.var(self.t1) / 300 + numpy.var(self.t2) / 50
+        self.checkMeanVar(deltas, mu, var)
+
+        random.seed(6)
+        naive = numpy.array([hypothesis.Resample(self.t1, self.t2, 300, 50)
+                             for i in range(2000)])
+        self.checkMeanVar(naive, mu, var)
+        self.assertTrue(abs(deltas.var() / naive.var() - 1) < 0.15)
+
+    def testResampleDeltasBatches(self):
+        saved = hypothesis.BATCH_VALUES
+        hypothesis.BATCH_VALUES = 350 * 64
+        try:
+            serial = hypothesis.ResampleDeltas(self.t1, self.t2, 300, 50,
+                                               iters=1000, seed=7)
+            parallel = hypothesis.ResampleDeltas(self.t1, self.t2, 300, 50,
+                                                 iters=1000, seed=7,
+                                                 processes=2)
+        finally:
+            hypothesis.BATCH_VALUES = saved
+
+        self.assertEquals(serial.shape, (1000,))
+        self.assertTrue(numpy.array_equal(serial, parallel))
+
+    def testSampleMeans(self):
+        t = numpy.array(self.t1, dtype=numpy.float64)
+        mu = t.mean()
+
+        # the multinomial shortcut and indexing agree in distribution
+        for n in [5, 100]:
+            state = numpy.random.RandomState(8)
+            means = hypothesis.SampleMeans(t, n, 4000, state)
+            self.assertEquals(means.shape, (4000,))
+            self.checkMeanVar(means, mu, t.var() / n)
+
+        # integer data give float means on both paths
+        ints = numpy.array(self.t1)
+        self.assertEquals(ints.dtype.kind, 'i')
+        for n in [5, 100]:
+            state = numpy.random.RandomState(8)
+            means = hypothesis.SampleMeans(ints, n, 4000, state)
+            state = numpy.random.RandomState(8)
+            expected = hypothesis.SampleMeans(t, n, 4000, state)
+            self.assertTrue(numpy.array_equal(means, expected))
+            self.assertTrue((means != numpy.floor(means)).any())
+
+    def testPermuteDeltas(self):
+        # a pool with every value distinct is shuffled, and one with few
+        # distinct values is split with hypergeometric draws
+        for t1 in [self.t2, self.t1]:
+            pool = numpy.array(t1 + self.t2, dtype=numpy.float64)
+            n = len(t1)
+            m = len(pool) - n
+            state = numpy.random.RandomState(9)
+            deltas = hypothesis.PermuteDeltas(pool, n, 4000, state)
+            self.assertEquals(deltas.shape, (4000,))
+
+            state = numpy.random.RandomState(9)
+            again = hypothesis.PermuteDeltas(pool, n, 4000, state)
+            self.assertTrue(numpy.array_equal(deltas, again))
+
+            # sampling without replacement shrinks the variance
+            big = float(len(pool))
+            var = pool.var() / n * (big - n) / (big - 1) * (big / m)**2
+            self.checkMeanVar(deltas, 0, var)
+
+    def testPermuteDeltasExact(self):
+        # leaving out one of five values; each split has a known delta
+        pool = numpy.array([1, 1, 2, 2, 3], dtype=numpy.float64)
+        state = numpy.random.RandomState(10)
+        deltas = hypothesis.PermuteDeltas(pool, 4, 5000, state)
+
+        expected = dict(((9 - v) / 4.0 - v, p)
+                        for v, p in [(1, 0.4), (2, 0.4), (3, 0.2)])
+        values, counts = numpy.unique(deltas, return_counts=True)
+        self.assertEquals(sorted(values), sorted(expected))
+        for value, count in zip(values, counts):
+            self.assertAlmostEquals(count / 5000.0, expected[value], places=1)
+
+    def testWilsonInterval(self):
+        low, high = hypothesis.WilsonInterval(8, 10, z=1.96)
+        self.assertAlmostEquals(low, 0.4902, places=4)
+        self.assertAlmostEquals(high, 0.9433, places=4)
+
+        # with no successes the interval starts at 0
+        low, high = hypothesis.WilsonInterval(0, 1000, z=3.0)
+        self.assertAlmostEquals(low, 0)
+        self.assertAlmostEquals(high, 9.0 / 1009)
+
+    def testSequentialDeltas(self):
+        def Draw(size, state):
+            return state.normal(0, 1, size)
+
+        # a clear effect stops after the first batch
+        deltas = hypothesis.SequentialDeltas(Draw, 5.0, 10000, alpha=0.05,
+                                             seed=11, batch_size=1000)
+        self.assertEquals(len(deltas), 1000)
+
+        # a borderline one, with p-value near alpha, runs all iters
+        deltas = hypothesis.SequentialDeltas(Draw, 1.96, 5000, alpha=0.05,
+                                             seed=11, batch_size=1000)
+        self.assertEquals(len(deltas), 5000)
+
+        # without alpha, it never stops early, and the seed determines
+        # the deltas
+        deltas = hypothesis.SequentialDeltas(Draw, 5.0, 3500, seed=11)
+        self.assertEquals(len(deltas), 3500)
+        state = numpy.random.RandomState(11)
+        expected = numpy.concatenate([Draw(1000, state) for i in range(3)] +
+                                     [Draw(500, state)])
+        self.assertTrue(numpy.array_equal(deltas, expected))
+
+    def testResampleStats(self):
+        stats = [hypothesis.DiffMeans, hypothesis.LogVarRatio]
+        results = hypothesis.ResampleStats(self.t1, self.t2, stats,
+                                           iters=2000, seed=13)
+        again = hypothesis.ResampleStats(self.t1, self.t2, stats,
+                                         iters=2000, seed=13)
+        self.assertEquals(len(results), 2)
+
+        for (observed, cdf, pvalue), (_, cdf2, pvalue2) in zip(results, again):
+            self.assertTrue(numpy.array_equal(cdf.xs, cdf2.xs))
+            self.assertEquals(pvalue, pvalue2)
+            self.assertTrue(0 <= pvalue <= 1)
+
+        # the observed statistics and the null distribution of DiffMeans
+        observed, cdf, pvalue = results[0]
+        self.assertAlmostEquals(observed,
+                                numpy.mean(self.t1) - numpy.mean(self.t2))
+        self.assertAlmostEquals(cdf.Mean(), 0, places=1)
+        pool = self.t1 + self.t2
+        var = numpy.var(pool) / 300 + numpy.var(pool) / 50
+        self.assertTrue(abs(cdf.Var() / var - 1) < 0.1)
+        self.assertAlmostEquals(results[1][0],
+                                math.log(numpy.var(self.t1) /
+                                         numpy.var(self.t2)))
+
+        # shuffling the labels samples without replacement
+        [(_, cdf, pvalue)] = hypothesis.ResampleStats(
+            self.t1, self.t2, [hypothesis.DiffMeans], iters=2000,
+            method='permutation', seed=14)
+        var = numpy.var(pool) / 300 * 50 / 349 * (350 / 50.0)**2
+        self.assertAlmostEquals(cdf.Mean(), 0, places=1)
+        self.assertTrue(abs(cdf.Var() / var - 1) < 0.1)
+        self.assertRaises(ValueError, hypothesis.ResampleStats, self.t1,
+                          self.t2, stats, method='jackknife')
+        self.assertRaises(ValueError, hypothesis.ResampleStats, self.t1,
+                          self.t2, stats, iters=0)
+
+    def testMakeChiSquared(self):
+        edges = [37, 40]
+        stat = hypothesis.MakeChiSquared(edges)
+        sample1 = numpy.array([[35, 37, 39, 40, 41, 36]], dtype=float)
+        sample2 = numpy.array([[36, 38, 42, 43]], dtype=float)
+
+        # a value equal to an edge goes in the bin above it
+        counts = hypothesis.BinCounts(sample1, numpy.array(edges))
+        self.assertEquals(counts.tolist(), [[2, 2, 2]])
+
+        observed = [[2, 2, 2], [1, 1, 2]]
+        cols = [3, 3, 4]
+        chi2 = 0
+        for row, n in zip(observed, [6, 4]):
+            for obs, col in zip(row, cols):
+                exp = n * col / 10.0
+                chi2 += (obs - exp)**2 / exp
+        self.assertAlmostEquals(stat(sample1, sample2)[0], chi2)
+
+        # the null distribution is seeded and never negative
+        results = hypothesis.ResampleStats(self.t1, self.t2,
+                                           [hypothesis.MakeChiSquared(edges)],
+                                           iters=1000, seed=15)
+        again = hypothesis.ResampleStats(self.t1, self.t2,
+                                         [hypothesis.MakeChiSquared(edges)],
+                                         iters=1000, seed=15)
+        [(observed, cdf, pvalue)] = results
+        self.assertTrue(numpy.array_equal(cdf.xs, again[0][1].xs))
+        self.assertTrue(cdf.xs[0] >= 0)
+        self.assertEquals(pvalue, 1 - cdf.Prob(observed))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,10 +6,12 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
 import matplotlib.pyplot as pyplot
+import numpy
 
 import Cdf
 import myplot
 import random
+import Suite
 
 
 def ParetoCdf(x, alpha, xmin):
@@ -68,11 +70,59 @@ def TallestPareto(iters=2, n=10000, xmin=100, alpha=1.7):
     return tallest
 
 
+def LogLikelihood(sample, alphas, xmins):
+    """Computes the log likelihood of a sample for a grid of parameters.
+
+    The likelihood depends on the sample only through its size, the
+    sum of its logs, and its minimum; it is 0 wherever xmin exceeds
+    the smallest value.
+
+    Args:
+        sample: sequence of values
+        alphas: array of alpha values (see JointSuite.Params)
+        xmins: array of xmin values, broadcastable against alphas
+
+    Returns:
+        array of log likelihoods
+    """
+    xs = numpy.asarray(sample, dtype=numpy.float64)
+    n = len(xs)
+    total = numpy.log(xs).sum()
+
+    with numpy.errstate(divide='ignore'):
+        logs = (n * numpy.log(alphas) + n * alphas * numpy.log(xmins) -
+                (alphas + 1) * total)
+    return numpy.where(xmins <= xs.min(), logs, -numpy.inf)
+
+
+def EstimatePareto(sample, alphas, xmins):
+    """Computes the joint posterior of alpha and xmin given a sample.
+
+    Args:
+        sample: sequence of values
+        alphas: sequence of hypothetical values of alpha
+        xmins: sequence of hypothetical values of xmin
+
+    Returns:
+        JointSuite object
+    """
+    suite = Suite.JointSuite([alphas, xmins], ['alpha', 'xmin'], 'pareto')
+    suite.LogUpdate(sample, LogLikelihood)
+    return suite
+
+
 def main():
     MakeFigure()
     MakeParetoCdf()
     print TallestPareto(iters=2)
 
+    sample = [100 * random.paretovariate(1.7) for i in range(1000)]
+    suite = EstimatePareto(sample,
+                           numpy.linspace(1.2, 2.2, 201),
+                           numpy.linspace(95, 105, 201))
+    for name in suite.names:
+        print name, suite.Mean(name), suite.CredibleInterval(name, 90)
+
 
 if __name__ == "__main__":
     main()
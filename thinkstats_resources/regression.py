@@ -0,0 +1,265 @@
+"""This file contains code used in "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2010 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+import math
+import numpy
+
+
+def Fit(formula, data):
+    """Fits a linear model specified by a formula like R's lm.
+
+    Args:
+        formula: string like 'weights ~ first + ages + ages2'
+        data: map from variable name to sequence of values
+
+    Returns:
+        Regression object
+    """
+    yname, xnames = ParseFormula(formula)
+    columns = [data[name] for name in xnames]
+    return Regress(data[yname], columns, xnames)
+
+
+def ParseFormula(formula):
+    """Splits a formula like 'y ~ a + b' into names.
+
+    Args:
+        formula: string
+
+    Returns:
+        tuple of (dependent variable name, list of predictor names)
+    """
+    try:
+        left, right = formula.split('~')
+    except ValueError:
+        raise ValueError('formula should look like y ~ a + b: %s' % formula)
+    xnames = [name.strip() for name in right.split('+')]
+    return left.strip(), xnames
+
+
+def Regress(ys, columns, names=None):
+    """Computes a multiple linear regression with an intercept.
+
+    Solves the least squares problem using the QR decomposition of the
+    design matrix, which is more accurate than solving the normal
+    equations.
+
+    Args:
+        ys: sequence of values of the dependent variable
+        columns: sequence of sequences, the values of each predictor
+        names: sequence of predictor names
+
+    Returns:
+        Regression object
+    """
+    ys = numpy.asarray(ys, dtype=numpy.float64)
+    n = len(ys)
+    if names is None:
+        names = ['x%d' % (i+1) for i in range(len(columns))]
+
+    design = numpy.empty((n, len(columns) + 1))
+    design[:, 0] = 1
+    for i, column in enumerate(columns):
+        design[:, i+1] = column
+
+    q, r = numpy.linalg.qr(design)
+    coefs = numpy.linalg.solve(r, q.T.dot(ys))
+
+    res = ys - design.dot(coefs)
+    rss = res.dot(res)
+    dev = ys - ys.mean()
+    tss = dev.dot(dev)
+
+    # the covariance of the estimates is sigma**2 (R^T R)^-1
+    df_resid = n - design.shape[1]
+    rinv = numpy.linalg.inv(r)
+    cov = rss / df_resid * rinv.dot(rinv.T)
+    stderrs = numpy.sqrt(numpy.diag(cov))
+
+    return Regression(['(Intercept)'] + list(names), coefs, stderrs,
+                      df_resid, rss, tss)
+
+
+class Regression(object):
+    """Represents the results of a multiple linear regression.
+
+    Attributes:
+        names: list of coefficient names, starting with the intercept
+        coefs: array of estimated coefficients
+        stderrs: array of standard errors of the estimates
+        tvalues: array of t statistics
+        pvalues: array of two-sided p-values for the t statistics
+        df_model: number of predictors
+        df_resid: residual degrees of freedom
+        sigma: residual standard error
+        rsquared: coefficient of determination
+        adj_rsquared: R-squared adjusted for the number of predictors
+        fstat: F statistic for the model against the intercept alone
+        fpvalue: p-value of the F statistic
+    """
+    def __init__(self, names, coefs, stderrs, df_resid, rss, tss):
+        self.names = names
+        self.coefs = coefs
+        self.stderrs = stderrs
+        self.df_model = len(coefs) - 1
+        self.df_resid = df_resid
+
+        self.tvalues = coefs / stderrs
+        self.pvalues = numpy.array([StudentTPValue(t, df_resid)
+                                    for t in self.tvalues])
+
+        self.sigma = math.sqrt(rss / df_resid)
+        self.rsquared = 1 - rss / tss
+        n = df_resid + self.df_model + 1
+        self.adj_rsquared = 1 - (1 - self.rsquared) * (n - 1) / df_resid
+
+        self.fstat = (tss - rss) / self.df_model / (rss / df_resid)
+        self.fpvalue = FPValue(self.fstat, self.df_model, df_resid)
+
+    def Summary(self):
+        """Formats the results like the summary of R's lm.
+
+        Returns:
+            string
+        """
+        width = max(len(name) for name in self.names)
+        lines = ['Coefficients:',
+                 '%-*s %12s %12s %9s %10s' % (width, '', 'Estimate',
+                                               'Std. Error', 't value',
+                                               'Pr(>|t|)')]
+        for row in zip(self.names, self.coefs, self.stderrs,
+                       self.tvalues, self.pvalues):
+            name, coef, stderr, t, p = row
+            lines.append('%-*s %12.6g %12.6g %9.3f %10s %s' %
+                         (width, name, coef, stderr, t,
+                          FormatPValue(p), Stars(p)))
+
+        lines += ['---',
+                  "Signif. codes:  0 '***' 0.001 '**' 0.01 '*' 0.05 "
+                  "'.' 0.1 ' ' 1",
+                  '',
+                  'Residual standard error: %.4g on %d degrees of freedom' %
+                  (self.sigma, self.df_resid),
+                  'Multiple R-squared: %.4g,\tAdjusted R-squared: %.4g' %
+                  (self.rsquared, self.adj_rsquared),
+                  'F-statistic: %.4g on %d and %d DF,  p-value: %s' %
+                  (self.fstat, self.df_model, self.df_resid,
+                   FormatPValue(self.fpvalue))]
+        return '\n'.join(lines)
+
+
+def FormatPValue(p):
+    """Formats a p-value the way R does, with a floor at 2e-16."""
+    if p < 2e-16:
+        return '< 2e-16'
+    return '%.3g' % p
+
+
+def Stars(p):
+    """Returns R's significance code for a p-value."""
+    for cutoff, code in [(0.001, '***'), (0.01, '**'), (0.05, '*'),
+                         (0.1, '.')]:
+        if p < cutoff:
+            return code
+    return ''
+
+
+def StudentTPValue(t, df):
+    """Computes the two-sided p-value of a t statistic.
+
+    Args:
+        t: float t statistic
+        df: degrees of freedom
+
+    Returns:
+        float probability of a value at least as far from 0 as t
+    """
+    t, df = float(t), float(df)
+    return RegularizedBeta(df / 2.0, 0.5, df / (df + t * t))
+
+
+def FPValue(f, df1, df2):
+    """Computes the p-value of an F statistic.
+
+    Args:
+        f: float F statistic
+        df1: numerator degrees of freedom
+        df2: denominator degrees of freedom
+
+    Returns:
+        float probability of a value greater than f
+    """
+    f, df1, df2 = float(f), float(df1), float(df2)
+    return RegularizedBeta(df2 / 2.0, df1 / 2.0, df2 / (df2 + df1 * f))
+
+
+def RegularizedBeta(a, b, x):
+    """Evaluates the regularized incomplete beta function I_x(a, b).
+
+    Uses the continued fraction in Numerical Recipes, section 6.4,
+    evaluated with the modified Lentz method.
+
+    Args:
+        a, b: positive float parameters
+        x: float between 0 and 1
+
+    Returns:
+        float
+    """
+    a, b, x = float(a), float(b), float(x)
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) +
+                 a * math.log(x) + b * math.log1p(-x))
+    front = math.exp(log_front)
+
+    # the continued fraction converges quickly on this side
+    if x < (a + 1) / (a + b + 2):
+        return front * _BetaFraction(a, b, x) / a
+    return 1 - front * _BetaFraction(b, a, 1 - x) / b
+
+
+def _BetaFraction(a, b, x, max_iters=300, eps=1e-15):
+    """Evaluates the continued fraction for RegularizedBeta."""
+    tiny = 1e-300
+    c = 1.0
+    d = 1 - (a + b) * x / (a + 1)
+    if abs(d) < tiny:
+        d = tiny
+    d = 1 / d
+    h = d
+
+    for m in range(1, max_iters + 1):
+        # even step
+        num = m * (b - m) * x / ((a + 2*m - 1) * (a + 2*m))
+        d = 1 + num * d
+        if abs(d) < tiny:
+            d = tiny
+        c = 1 + num / c
+        if abs(c) < tiny:
+            c = tiny
+        d = 1 / d
+        h *= d * c
+
+        # odd step
+        num = -(a + m) * (a + b + m) * x / ((a + 2*m) * (a + 2*m + 1))
+        d = 1 + num * d
+        if abs(d) < tiny:
+            d = tiny
+        c = 1 + num / c
+        if abs(c) < tiny:
+            c = tiny
+        d = 1 / d
+        delta = d * c
+        h *= delta
+
+        if abs(delta - 1) < eps:
+            break
+    return h
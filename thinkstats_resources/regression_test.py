@@ -0,0 +1,79 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2010 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+import unittest
+
+import correlation
+import regression
+
+class Test(unittest.TestCase):
+
+    def testFit(self):
+        xs = [1, 2, 3, 4, 5, 6]
+        ys = [2.1, 3.9, 6.2, 7.8, 10.1, 12.2]
+        data = dict(xs=xs, ys=ys)
+        res = regression.Fit('ys ~ xs', data)
+        inter, slope = correlation.LeastSquares(xs, ys)
+
+        self.assertEquals(res.names, ['(Intercept)', 'xs'])
+        self.assertAlmostEquals(res.coefs[0], inter)
+        self.assertAlmostEquals(res.coefs[1], slope)
+        self.assertEquals(res.df_resid, 4)
+
+        # with one predictor, F is the square of t
+        self.assertAlmostEquals(res.fstat, res.tvalues[1]**2)
+        self.assertAlmostEquals(res.fpvalue, res.pvalues[1])
+
+        res2 = correlation.Residuals(xs, ys, inter, slope)
+        r2 = correlation.CoefDetermination(ys, res2)
+        self.assertAlmostEquals(res.rsquared, r2)
+
+        self.assertRaises(ValueError, regression.Fit, 'ys xs', data)
+
+    def testRegress(self):
+        x1 = [1, 2, 3, 4, 5, 6, 7, 8]
+        x2 = [1, 0, 1, 0, 1, 1, 0, 0]
+        ys = [3 + 2*a - 5*b for a, b in zip(x1, x2)]
+        ys[0] += 0.1
+        ys[5] -= 0.1
+        res = regression.Regress(ys, [x1, x2])
+
+        self.assertEquals(res.names, ['(Intercept)', 'x1', 'x2'])
+        self.assertAlmostEquals(res.coefs[1], 2, places=1)
+        self.assertAlmostEquals(res.coefs[2], -5, places=1)
+        self.assertTrue(res.pvalues[1] < 1e-6)
+        self.assertTrue(0.999 < res.rsquared < 1)
+        self.assertTrue(res.adj_rsquared < res.rsquared)
+        self.assertTrue('Coefficients:' in res.Summary())
+
+    def testRegularizedBeta(self):
+        self.assertAlmostEquals(regression.RegularizedBeta(1, 1, 0.3), 0.3)
+        self.assertAlmostEquals(regression.RegularizedBeta(2, 2, 0.5), 0.5)
+        self.assertAlmostEquals(regression.RegularizedBeta(2, 3, 0.4),
+                                0.5248)
+
+        # the 0.975 quantile of t with 10 degrees of freedom is 2.228
+        p = regression.StudentTPValue(2.228139, 10)
+        self.assertAlmostEquals(p, 0.05, places=6)
+
+    def testIntegerArguments(self):
+        self.assertAlmostEquals(regression.RegularizedBeta(10, 1, 1e-4) /
+                                1e-40, 1)
+        self.assertAlmostEquals(regression.RegularizedBeta(2, 3, 0),
+                                regression.RegularizedBeta(2.0, 3.0, 0.0))
+        self.assertAlmostEquals(regression.StudentTPValue(2, 10),
+                                regression.StudentTPValue(2.0, 10.0))
+        self.assertAlmostEquals(regression.StudentTPValue(2, 10),
+                                0.07338803, places=6)
+        self.assertAlmostEquals(regression.FPValue(3, 2, 10),
+                                regression.FPValue(3.0, 2.0, 10.0))
+        self.assertAlmostEquals(regression.FPValue(3, 2, 10),
+                                0.09536743, places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,8 +6,18 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
 import sys
+import collections
 import gzip
+import hashlib
+import itertools
+import logging
+import multiprocessing
 import os
+import shutil
+import tempfile
+import zlib
+
+import numpy
 
 class Record(object):
     """Represents a record."""
@@ -100,6 +110,741 @@ class Table(object):
         pass
 
 
+class ColumnRecord(Record):
+    """Represents one row of a ColumnTable.
+
+    The record holds no data of its own; reading or writing an attribute
+    reads or writes the corresponding element of the table's columns.
+    """
+
+    def __init__(self, table, index):
+        self.__dict__['_table'] = table
+        self.__dict__['_index'] = index
+
+    def __getattr__(self, field):
+        return self._table.GetValue(field, self._index)
+
+    def __setattr__(self, field, val):
+        self._table.SetValue(field, self._index, val)
+
+
+class ColumnRecords(object):
+    """Sequence of ColumnRecords that makes a ColumnTable look like a list."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('record index out of range')
+        return ColumnRecord(self.table, index)
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield ColumnRecord(self.table, i)
+
+
+# name of the directory, inside the data directory, where ColumnTable
+# caches recoded columns
+CACHE_DIR = '.survey_cache'
+
+
+class ColumnTable(Table):
+    """Represents a table as a set of typed columns.
+
+    Each field is stored as a NumPy array, with a parallel boolean
+    array that is True where the value is 'NA'.  table.records provides
+    a list-like view of the rows, so code that uses rec.field still works.
+
+    Attributes:
+        columns: map from field name to array of values
+        masks: map from field name to array of bool, True where 'NA'
+        n: int number of rows
+    """
+
+    # increment this in a child class whenever its Recode changes,
+    # so that columns cached by the old version are not used
+    recode_version = 1
+
+    # number of processes ReadFile uses to decode the file; None
+    # means one per CPU
+    processes = 1
+
+    # number of bytes ReadFile and IterBatches decode at a time
+    block_size = 16*1024*1024
+
+    def __init__(self):
+        self.columns = {}
+        self.masks = {}
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def records(self):
+        return ColumnRecords(self)
+
+    def ReadRecords(self, data_dir='.', n=None, cache=False):
+        """Reads and recodes the data file, or loads a cached copy.
+
+        If cache is True, the recoded columns are stored in CACHE_DIR
+        under data_dir in NumPy's .npy format and memory-mapped when
+        they are loaded, so reading a cached table does not decompress
+        or parse anything.
+
+        Args:
+            data_dir: string directory name
+            n: int maximum number of records to read
+            cache: whether to use and update the cache
+        """
+        filename = self.GetFilename()
+        fields = self.GetFields()
+
+        path = None
+        if cache:
+            key = self.CacheKey(os.path.join(data_dir, filename), fields, n)
+            path = os.path.join(data_dir, CACHE_DIR, key)
+            if self.LoadColumns(path):
+                return
+
+        self.ReadFile(data_dir, filename, fields, ColumnRecord, n)
+        self.Recode()
+
+        if path:
+            self.SaveColumns(path)
+
+    def CacheKey(self, filename, fields, n=None):
+        """Makes a name for the cached columns of a data file.
+
+        The name depends on the size and modification time of the file,
+        the fields, the number of records, and the recode_version, so a
+        change in any of them makes a new entry.
+
+        Args:
+            filename: string path of the data file
+            fields: sequence of (name, start, end, cast) tuples
+            n: int maximum number of records to read
+
+        Returns:
+            string
+        """
+        stat = os.stat(filename)
+        spec = [(field, start, end, getattr(cast, '__name__', repr(cast)))
+                for field, start, end, cast in fields]
+        key = (self.__class__.__name__, stat.st_size, stat.st_mtime,
+               spec, n, self.recode_version)
+        digest = hashlib.md5(repr(key)).hexdigest()
+        return '%s-%s' % (os.path.basename(filename), digest)
+
+    def SaveColumns(self, path):
+        """Writes the columns to a directory, one .npy file per array.
+
+        The files are written to a temporary directory that is renamed
+        when it is complete, so readers never see a partial entry.
+        Failure to write the cache is logged, not raised.
+
+        Args:
+            path: string directory name
+        """
+        parent = os.path.dirname(path)
+        tmp = None
+        try:
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+            tmp = tempfile.mkdtemp(dir=parent)
+            for field, data in self.columns.iteritems():
+                numpy.save(os.path.join(tmp, field + '.npy'), data)
+                numpy.save(os.path.join(tmp, field + '.mask.npy'),
+                           self.masks[field])
+            os.rename(tmp, path)
+        except (IOError, OSError), e:
+            logging.warning('SaveColumns: could not cache %s: %s', path, e)
+            if tmp:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    def LoadColumns(self, path):
+        """Loads columns saved by SaveColumns, if there are any.
+
+        The arrays are memory-mapped copy-on-write, so changes to the
+        table are not written back to the cache.
+
+        Args:
+            path: string directory name
+
+        Returns:
+            boolean, whether the columns were loaded
+        """
+        if not os.path.isdir(path):
+            return False
+
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.mask.npy') or not name.endswith('.npy'):
+                continue
+            field = name[:-len('.npy')]
+            data = numpy.load(os.path.join(path, name), mmap_mode='c')
+            mask = numpy.load(os.path.join(path, field + '.mask.npy'),
+                              mmap_mode='c')
+            self.SetColumn(field, data, mask)
+        return True
+
+    def ReadFile(self, data_dir, filename, fields, constructor, n=None):
+        """Reads a compressed data file and builds one column per field.
+
+        Args:
+            data_dir: string directory name
+            filename: string name of the file to read
+
+            fields: sequence of (name, start, end, cast) tuples specifying 
+            the fields to extract
+
+            constructor: ignored; records are views onto the columns
+        """
+        filename = os.path.join(data_dir, filename)
+        blocks = ReadBlocks(filename, self.block_size)
+        columns = ReadColumns(blocks, fields, n, self.processes)
+
+        for field, _, _, _ in fields:
+            self.SetColumn(field, *columns[field])
+
+    def IterBatches(self, data_dir='.', fields=None, where=None, n=None):
+        """Reads the data file one block at a time, without keeping it.
+
+        Each block is decoded and recoded as a separate table, so memory
+        use depends on the block size, not the size of the file.
+
+        Args:
+            data_dir: string directory name
+            fields: sequence of field names to decode, a subset of the
+                    names in GetFields(); the others are skipped
+            where: function that takes a table and returns an array of
+                   bool, True for the rows to keep
+            n: int maximum number of records to read from the file
+
+        Returns:
+            iterator of tables of the same type as this one
+        """
+        spec = self.GetFields()
+        if fields is not None:
+            names = [field for field, _, _, _ in spec]
+            for field in fields:
+                if field not in names:
+                    raise ValueError('unknown field %s' % field)
+            spec = [t for t in spec if t[0] in fields]
+
+        filename = os.path.join(data_dir, self.GetFilename())
+        blocks = ReadBlocks(filename, self.block_size)
+        for data in LimitLines(SplitLines(blocks), n):
+            batch = self.__class__()
+            for field, column in DecodeBlock((data, spec)).iteritems():
+                batch.SetColumn(field, *column)
+            batch.Recode()
+
+            if where is not None:
+                batch = batch.Select(where(batch))
+            yield batch
+
+    def IterRecords(self, data_dir='.', fields=None, where=None, n=None):
+        """Generates records from the data file; see IterBatches.
+
+        Returns:
+            iterator of ColumnRecords
+        """
+        for batch in self.IterBatches(data_dir, fields, where, n):
+            for record in batch.records:
+                yield record
+
+    def Select(self, rows):
+        """Makes a new table with a subset of the rows of this one.
+
+        Args:
+            rows: array of bool, or array of int indices
+
+        Returns:
+            table of the same type as this one
+        """
+        table = self.__class__()
+        for field, data in self.columns.iteritems():
+            table.SetColumn(field, data[rows], self.masks[field][rows])
+        return table
+
+    def SetColumn(self, field, data, mask=None):
+        """Adds or replaces a column.
+
+        Args:
+            field: string field name
+            data: array of values
+            mask: array of bool, True where the value is 'NA';
+                  if omitted, no values are 'NA'
+        """
+        data = numpy.asanyarray(data)
+        if mask is None:
+            mask = numpy.zeros(len(data), dtype=bool)
+        if self.columns:
+            if len(data) != self.n:
+                raise ValueError('column %s has %d rows; table has %d' %
+                                 (field, len(data), self.n))
+        else:
+            self.n = len(data)
+        self.columns[field] = data
+        self.masks[field] = numpy.asanyarray(mask, dtype=bool)
+
+    def GetColumn(self, field):
+        """Returns a column as a masked array (no copy is made).
+
+        Args:
+            field: string field name
+        """
+        return numpy.ma.MaskedArray(self.columns[field], self.masks[field])
+
+    def GetValue(self, field, index):
+        """Returns the value of a field for one row, or 'NA'.
+
+        Raises AttributeError if there is no such field.
+        """
+        try:
+            data = self.columns[field]
+        except KeyError:
+            raise AttributeError(field)
+        if self.masks[field][index]:
+            return 'NA'
+        return data[index].item()
+
+    def SetValue(self, field, index, val):
+        """Sets the value of a field for one row.
+
+        If the field is new, it is created with all other rows 'NA'.
+        If val does not fit the column's type, the column is converted
+        to float.
+        """
+        if field not in self.columns:
+            dtype = numpy.float64 if isinstance(val, float) else numpy.int64
+            self.columns[field] = numpy.zeros(self.n, dtype=dtype)
+            self.masks[field] = numpy.ones(self.n, dtype=bool)
+
+        if val == 'NA':
+            self.masks[field][index] = True
+            return
+
+        data = self.columns[field]
+        if isinstance(val, float) and data.dtype.kind in 'iub':
+            data = data.astype(numpy.float64)
+            self.columns[field] = data
+        data[index] = val
+        self.masks[field][index] = False
+
+    def AddRecord(self, record):
+        """Adds a record to this table.
+
+        Args:
+            record: an object with an attribute for each column
+        """
+        self.ExtendRecords([record])
+
+    def ExtendRecords(self, records):
+        """Adds records to this table.
+
+        Args:
+            records: a sequence of objects with an attribute for each column
+        """
+        records = list(records)
+        if not records:
+            return
+
+        fields = self.columns.keys() or RecordFields(records[0])
+        n = self.n
+        for field in fields:
+            values = [getattr(rec, field, 'NA') for rec in records]
+            data, mask = MakeColumn(values)
+            if field in self.columns:
+                data = numpy.concatenate([self.columns[field], data])
+                mask = numpy.concatenate([self.masks[field], mask])
+            self.columns[field] = data
+            self.masks[field] = mask
+        self.n = n + len(records)
+
+
+# bytes that Python's int() and float() treat as whitespace, plus the
+# zeros that pad short lines
+WHITESPACE = numpy.array([0, 9, 10, 11, 12, 13, 32], dtype=numpy.uint8)
+
+# widest field that DecodeInts can handle without overflowing int64
+MAX_INT_WIDTH = 18
+
+
+def ReadBlocks(filename, block_size=16*1024*1024):
+    """Generates the contents of a file, decompressed, in large blocks.
+
+    Gzip files are inflated with zlib directly, which is considerably
+    faster than reading through the gzip module.
+
+    Args:
+        filename: string name of the file
+        block_size: int number of bytes to read at a time
+    """
+    fp = open(filename, 'rb')
+    try:
+        if not filename.endswith('gz'):
+            for block in iter(lambda: fp.read(block_size), ''):
+                yield block
+            return
+
+        # 16 + MAX_WBITS tells zlib to expect a gzip header
+        decomp = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        for raw in iter(lambda: fp.read(block_size), ''):
+            while raw:
+                block = decomp.decompress(raw)
+                if block:
+                    yield block
+
+                # a gzip file can contain more than one member
+                raw = decomp.unused_data
+                if raw:
+                    decomp = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        block = decomp.flush()
+        if block:
+            yield block
+    finally:
+        fp.close()
+
+
+def SplitLines(blocks):
+    """Regroups blocks of text so that each one ends at a newline.
+
+    Args:
+        blocks: iterator of strings
+
+    Returns:
+        iterator of strings that each contain only whole lines
+    """
+    rest = ''
+    for block in blocks:
+        data = rest + block
+        end = data.rfind('\n') + 1
+        if end:
+            yield data[:end]
+        rest = data[end:]
+    if rest:
+        yield rest
+
+
+def LimitLines(chunks, n=None):
+    """Truncates a sequence of chunks of lines after n lines.
+
+    Args:
+        chunks: iterator of strings that contain only whole lines
+        n: int maximum number of lines, or None for no limit
+
+    Returns:
+        iterator of strings
+    """
+    count = 0
+    for data in chunks:
+        if count == n:
+            break
+        num_lines = data.count('\n') + (not data.endswith('\n'))
+        if n is not None and count + num_lines > n:
+            buf = numpy.frombuffer(data, dtype=numpy.uint8)
+            ends = numpy.flatnonzero(buf == ord('\n'))
+            data = data[:ends[n-count-1]+1]
+            num_lines = n - count
+        count += num_lines
+        yield data
+
+
+def DecodeBlock(args):
+    """Decodes the fields in a string of lines.
+
+    Takes a single tuple so it can be used with a Pool.
+
+    Args:
+        args: tuple of (string of lines, sequence of fields)
+
+    Returns:
+        map from field name to (data array, bool mask array) pairs
+    """
+    data, fields = args
+    return DecodeFields(LinesToArray(data), fields)
+
+
+def ReadColumns(blocks, fields, n=None, processes=1):
+    """Reads fixed-width records and decodes each field as a column.
+
+    Decodes all of the records in each block with array operations,
+    rather than slicing and casting one line at a time.  Values that
+    cast can't convert become 'NA', as in Table.MakeRecord.
+
+    If processes is not 1, the blocks are decoded in a pool of worker
+    processes and the results are put back in the original order, so
+    the columns are the same either way.  At most two blocks per
+    process are read ahead of the results.  In that case the casts
+    must be picklable, which int and float are.
+
+    Args:
+        blocks: iterator of strings, as generated by ReadBlocks
+        fields: sequence of (name, start, end, cast) tuples
+        n: int maximum number of records to read
+        processes: int number of worker processes; None means one
+                   per CPU
+
+    Returns:
+        map from field name to (data array, bool mask array) pairs
+    """
+    tasks = ((data, fields) for data in LimitLines(SplitLines(blocks), n))
+
+    pool = None
+    if processes == 1:
+        results = itertools.imap(DecodeBlock, tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        limit = 2 * (processes or multiprocessing.cpu_count())
+        results = BoundedImap(pool, DecodeBlock, tasks, limit)
+
+    chunks = dict((field, []) for field, _, _, _ in fields)
+    done = False
+    try:
+        for block_columns in results:
+            for field, col in block_columns.iteritems():
+                chunks[field].append(col)
+        done = True
+    finally:
+        if pool:
+            if done:
+                pool.close()
+            else:
+                results.close()
+                pool.terminate()
+            pool.join()
+
+    columns = {}
+    for field, start, end, cast in fields:
+        if chunks[field]:
+            data = numpy.concatenate([data for data, _ in chunks[field]])
+            mask = numpy.concatenate([mask for _, mask in chunks[field]])
+        else:
+            data, mask = MakeColumn([], cast)
+        columns[field] = data, mask
+    return columns
+
+
+def BoundedImap(pool, func, tasks, limit):
+    """Applies func to each task in a pool, keeping a few in flight.
+
+    Like Pool.imap, generates the results in order, but reads the next
+    task only when fewer than limit are waiting, so a long iterator of
+    large tasks does not fill memory.  If the iterator is closed or
+    raises, waits for the tasks in flight before returning.
+
+    Args:
+        pool: multiprocessing.Pool
+        func: function that takes one task
+        tasks: iterator of tasks
+        limit: int maximum number of tasks submitted and not yet
+               returned
+
+    Returns:
+        iterator of results
+    """
+    pending = collections.deque()
+    try:
+        for task in tasks:
+            if len(pending) >= limit:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(func, (task,)))
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        # if we stop early, let the tasks in flight finish so their
+        # results do not fill the result pipe; otherwise terminating
+        # the pool can deadlock
+        for result in pending:
+            result.wait()
+
+
+def LinesToArray(data):
+    """Converts a string of lines to a 2-D array of bytes.
+
+    When all lines have the same length, the result is a view of the
+    string; otherwise short lines are padded with zeros.
+
+    Args:
+        data: string of newline-terminated lines
+
+    Returns:
+        array of uint8 with one row per line, newlines removed
+    """
+    buf = numpy.frombuffer(data, dtype=numpy.uint8)
+    if not data.endswith('\n'):
+        buf = numpy.append(buf, numpy.uint8(ord('\n')))
+
+    ends = numpy.flatnonzero(buf == ord('\n'))
+    starts = numpy.concatenate([[0], ends[:-1] + 1])
+    lengths = ends - starts
+
+    width = lengths.max()
+    if (lengths == width).all():
+        return buf.reshape(len(ends), width+1)[:, :width]
+
+    cols = numpy.arange(width)
+    inside = cols < lengths[:, None]
+    lines = numpy.zeros((len(ends), width), dtype=numpy.uint8)
+    lines[inside] = buf[(starts[:, None] + cols)[inside]]
+    return lines
+
+
+def DecodeFields(lines, fields):
+    """Decodes fixed-width fields from a 2-D array of bytes.
+
+    Args:
+        lines: array of uint8 with one row per record
+        fields: sequence of (name, start, end, cast) tuples
+
+    Returns:
+        map from field name to (data array, bool mask array) pairs
+    """
+    columns = {}
+    for field, start, end, cast in fields:
+        chars = lines[:, start-1:end]
+        if cast is int and chars.shape[1] <= MAX_INT_WIDTH:
+            columns[field] = DecodeInts(chars)
+        elif cast is float:
+            columns[field] = DecodeFloats(chars)
+        else:
+            values = CastStrings(ToStrings(chars), cast)
+            columns[field] = MakeColumn(values, cast)
+    return columns
+
+
+def DecodeInts(chars):
+    """Decodes a column of fixed-width integers.
+
+    A value is valid if it has the form int() accepts: optional
+    whitespace, an optional sign followed by optional whitespace, one
+    or more digits, optional whitespace.
+
+    Args:
+        chars: array of uint8 with one row per record
+
+    Returns:
+        tuple of (int64 array, bool mask array that is True where 'NA')
+    """
+    num_rows, width = chars.shape
+    if width == 0:
+        return (numpy.zeros(num_rows, dtype=numpy.int64),
+                numpy.ones(num_rows, dtype=bool))
+
+    blank = numpy.in1d(chars, WHITESPACE).reshape(chars.shape)
+    digit = (chars >= ord('0')) & (chars <= ord('9'))
+    sign = (chars == ord('-')) | (chars == ord('+'))
+
+    # find the first and last non-blank characters in each row
+    full = ~blank
+    first = full.argmax(axis=1)
+    last = width - 1 - full[:, ::-1].argmax(axis=1)
+
+    # if there is a sign, the digits start at the next non-blank
+    rows = numpy.arange(num_rows)
+    cols = numpy.arange(width)
+    signed = sign[rows, first]
+    after = full & (cols > first[:, None])
+    start = numpy.where(signed, after.argmax(axis=1), first)
+
+    inside = (cols >= start[:, None]) & (cols <= last[:, None])
+    valid = (full.any(axis=1) & (~signed | after.any(axis=1)) &
+             (~inside | digit).all(axis=1))
+
+    # weight each digit by its place value
+    powers = numpy.where(inside & digit, last[:, None] - cols, 0)
+    digits = numpy.where(inside & digit, chars - ord('0'), 0)
+    data = (digits.astype(numpy.int64) * 10 ** powers.astype(numpy.int64))
+    data = data.sum(axis=1)
+
+    negative = chars[rows, first] == ord('-')
+    data[negative] *= -1
+    data[~valid] = 0
+    return data, ~valid
+
+
+def DecodeFloats(chars):
+    """Decodes a column of fixed-width floating-point numbers.
+
+    Args:
+        chars: array of uint8 with one row per record
+
+    Returns:
+        tuple of (float64 array, bool mask array that is True where 'NA')
+    """
+    strings = ToStrings(chars)
+    try:
+        data = strings.astype(numpy.float64)
+        return data, numpy.zeros(len(data), dtype=bool)
+    except ValueError:
+        # at least one value is invalid; fall back to one at a time
+        return MakeColumn(CastStrings(strings, float), float)
+
+
+def ToStrings(chars):
+    """Converts a 2-D array of bytes to an array of strings, one per row."""
+    num_rows, width = chars.shape
+    if width == 0:
+        return numpy.array([''] * num_rows)
+    chars = numpy.ascontiguousarray(chars)
+    return chars.view('S%d' % width).ravel()
+
+
+def CastStrings(strings, cast):
+    """Applies cast to each string; values that raise ValueError are 'NA'."""
+    values = []
+    for s in strings:
+        try:
+            values.append(cast(s))
+        except ValueError:
+            values.append('NA')
+    return values
+
+
+def RecordFields(record):
+    """Returns the names of the fields in a record.
+
+    Args:
+        record: Record object or ColumnRecord
+    """
+    if isinstance(record, ColumnRecord):
+        return record._table.columns.keys()
+    return vars(record).keys()
+
+
+def MakeColumn(values, cast=None):
+    """Converts a list of values, some of which may be 'NA', to arrays.
+
+    Args:
+        values: sequence of numbers or 'NA'
+        cast: the callable that produced the values; int and float
+              columns get the corresponding dtype, others are inferred
+
+    Returns:
+        tuple of (data array, bool mask array that is True where 'NA')
+    """
+    mask = numpy.array([val == 'NA' for val in values], dtype=bool)
+    if cast is int:
+        dtype = numpy.int64
+    elif cast is float:
+        dtype = numpy.float64
+    elif any(isinstance(val, float) for val in values):
+        dtype = numpy.float64
+    else:
+        dtype = numpy.int64
+    data = [0 if val == 'NA' else val for val in values]
+    return numpy.array(data, dtype=dtype), mask
+
+
 class Respondents(Table):
     """Represents the respondent table."""
 
@@ -181,6 +926,26 @@ class Pregnancies(Table):
                 pass
 
 
+class ColumnRespondents(ColumnTable, Respondents):
+    """Represents the respondent table as columns."""
+
+
+class ColumnPregnancies(ColumnTable, Pregnancies):
+    """Represents the pregnancy table as columns."""
+
+    def Recode(self):
+        """Recodes whole columns; see Pregnancies.Recode."""
+        if 'agepreg' in self.columns:
+            self.columns['agepreg'] = self.columns['agepreg'] / 100.0
+
+        if 'birthwgt_lb' in self.columns and 'birthwgt_oz' in self.columns:
+            lb = self.columns['birthwgt_lb']
+            oz = self.columns['birthwgt_oz']
+            valid = ((~self.masks['birthwgt_lb']) & (lb < 20) &
+                     (~self.masks['birthwgt_oz']) & (oz <= 16))
+            self.SetColumn('totalwgt_oz', lb * 16 + oz, ~valid)
+
+
 def main(name, data_dir='.'):
     resp = Respondents()
     resp.ReadRecords(data_dir)
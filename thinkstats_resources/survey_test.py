@@ -0,0 +1,219 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2010 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+import gzip
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+import survey
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+FIELDS = ['caseid', 'prglength', 'outcome', 'birthord', 'agepreg',
+          'finalwgt', 'totalwgt_oz']
+
+class Test(unittest.TestCase):
+
+    def checkSameRecords(self, table1, table2):
+        self.assertEquals(len(table1), len(table2))
+        for r1, r2 in zip(table1.records, table2.records):
+            for field in FIELDS:
+                self.assertEquals(getattr(r1, field), getattr(r2, field))
+
+    def testColumnPregnancies(self):
+        table = survey.Pregnancies()
+        table.ReadRecords(DATA_DIR, n=1000)
+
+        columns = survey.ColumnPregnancies()
+        columns.ReadRecords(DATA_DIR, n=1000)
+
+        self.checkSameRecords(table, columns)
+        self.assertEquals(columns.columns['caseid'].dtype.kind, 'i')
+        self.assertEquals(columns.columns['finalwgt'].dtype.kind, 'f')
+
+    def testColumnRecords(self):
+        columns = survey.ColumnPregnancies()
+        columns.ReadRecords(DATA_DIR, n=10)
+        rec = columns.records[-1]
+
+        rec.agepreg = 'NA'
+        self.assertEquals(columns.records[9].agepreg, 'NA')
+        self.assertTrue(columns.GetColumn('agepreg').mask[9])
+
+        rec.newfield = 3.5
+        self.assertEquals(rec.newfield, 3.5)
+        self.assertEquals(columns.records[0].newfield, 'NA')
+        self.assertRaises(AttributeError, getattr, rec, 'nosuchfield')
+
+    def testExtendRecords(self):
+        columns = survey.ColumnPregnancies()
+        columns.ReadRecords(DATA_DIR, n=10)
+
+        pool = survey.ColumnPregnancies()
+        pool.ExtendRecords(columns.records[:4])
+        pool.AddRecord(columns.records[9])
+        self.assertEquals(len(pool), 5)
+        self.assertEquals(pool.records[4].caseid, columns.records[9].caseid)
+
+    def testReadColumns(self):
+        fields = [('a', 1, 3, int), ('b', 4, 7, float), ('c', 8, 9, int)]
+        text = ' 12 1.5 7\n-3 xyz\n  x  2.+1\n'
+        blocks = [text[:10], text[10:]]
+        columns = survey.ReadColumns(iter(blocks), fields)
+
+        data, mask = columns['a']
+        self.assertEquals(list(data[~mask]), [12, -3])
+        self.assertEquals(list(mask), [False, False, True])
+
+        data, mask = columns['b']
+        self.assertEquals(list(mask), [False, True, False])
+        self.assertEquals(list(data[~mask]), [1.5, 2.0])
+
+        data, mask = columns['c']
+        self.assertEquals(list(mask), [False, True, False])
+        self.assertEquals(list(data[~mask]), [7, 1])
+
+        columns = survey.ReadColumns(iter(blocks), fields, n=2)
+        self.assertEquals(len(columns['a'][0]), 2)
+
+    def testReadColumnsParallel(self):
+        filename = os.path.join(DATA_DIR, '2002FemPreg.dat.gz')
+        fields = survey.Pregnancies().GetFields()
+
+        for n in [None, 1234]:
+            blocks = survey.ReadBlocks(filename, block_size=100000)
+            serial = survey.ReadColumns(blocks, fields, n)
+            blocks = survey.ReadBlocks(filename, block_size=100000)
+            parallel = survey.ReadColumns(blocks, fields, n, processes=2)
+
+            for field, _, _, _ in fields:
+                data1, mask1 = serial[field]
+                data2, mask2 = parallel[field]
+                self.assertTrue(numpy.array_equal(data1, data2))
+                self.assertTrue(numpy.array_equal(mask1, mask2))
+        self.assertEquals(len(data1), 1234)
+
+    def testBoundedImap(self):
+        read = []
+        def Tasks():
+            for i in range(20):
+                read.append(i)
+                yield -i
+
+        pool = multiprocessing.Pool(2)
+        try:
+            results = survey.BoundedImap(pool, abs, Tasks(), 3)
+            for i, result in enumerate(results):
+                self.assertEquals(result, i)
+                self.assertTrue(len(read) <= i + 4)
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEquals(len(read), 20)
+
+    def testReadColumnsError(self):
+        filename = os.path.join(DATA_DIR, '2002FemPreg.dat.gz')
+        fields = survey.Pregnancies().GetFields()
+
+        def Blocks():
+            blocks = survey.ReadBlocks(filename, block_size=100000)
+            for i, block in enumerate(blocks):
+                if i == 3:
+                    raise IOError('truncated file')
+                yield block
+
+        self.assertRaises(IOError, survey.ReadColumns, Blocks(), fields,
+                          processes=2)
+
+    def testIterBatches(self):
+        table = survey.ColumnPregnancies()
+        table.ReadRecords(DATA_DIR, n=3000, cache=False)
+        live = [rec.totalwgt_oz for rec in table.records if rec.outcome == 1]
+
+        def LiveBirths(batch):
+            return batch.columns['outcome'] == 1
+
+        fields = ['outcome', 'birthwgt_lb', 'birthwgt_oz']
+        table.block_size = 100000
+        batches = list(table.IterBatches(DATA_DIR, fields, LiveBirths, n=3000))
+        self.assertTrue(len(batches) > 1)
+        self.assertEquals(sorted(batches[0].columns),
+                          sorted(fields + ['totalwgt_oz']))
+
+        records = table.IterRecords(DATA_DIR, fields, LiveBirths, n=3000)
+        self.assertEquals([rec.totalwgt_oz for rec in records], live)
+
+        self.assertRaises(ValueError, list,
+                          table.IterBatches(DATA_DIR, ['nosuchfield']))
+
+    def testDecodeInts(self):
+        t = ['  1', '-12', '+ 3', ' - ', '1 2', '   ', '007', '4x ']
+        chars = survey.LinesToArray('\n'.join(t))
+        data, mask = survey.DecodeInts(chars)
+        for s, val, na in zip(t, data, mask):
+            try:
+                self.assertEquals(val, int(s))
+                self.assertFalse(na)
+            except ValueError:
+                self.assertTrue(na)
+
+    def testCache(self):
+        data_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(DATA_DIR, '2002FemPreg.dat.gz')
+            lines = gzip.open(filename).readlines()[:100]
+            copy = os.path.join(data_dir, '2002FemPreg.dat.gz')
+            gzip.open(copy, 'wb').writelines(lines)
+
+            # nothing is cached unless asked
+            table = survey.ColumnPregnancies()
+            table.ReadRecords(data_dir)
+            self.assertFalse(os.path.exists(
+                os.path.join(data_dir, survey.CACHE_DIR)))
+
+            table = survey.ColumnPregnancies()
+            table.ReadRecords(data_dir, cache=True)
+            entries = os.listdir(os.path.join(data_dir, survey.CACHE_DIR))
+            self.assertEquals(len(entries), 1)
+
+            cached = survey.ColumnPregnancies()
+            cached.ReadRecords(data_dir, cache=True)
+            self.assertTrue(isinstance(cached.columns['caseid'],
+                                       numpy.memmap))
+            self.checkSameRecords(table, cached)
+
+            # writing to a cached table does not change the cache
+            cached.records[0].prglength = 99
+            again = survey.ColumnPregnancies()
+            again.ReadRecords(data_dir, cache=True)
+            self.assertEquals(again.records[0].prglength,
+                              table.records[0].prglength)
+
+            # a different record limit makes a new entry
+            limited = survey.ColumnPregnancies()
+            limited.ReadRecords(data_dir, n=30, cache=True)
+            self.assertEquals(len(limited), 30)
+            entries = os.listdir(os.path.join(data_dir, survey.CACHE_DIR))
+            self.assertEquals(len(entries), 2)
+            again = survey.ColumnPregnancies()
+            again.ReadRecords(data_dir, cache=True)
+            self.assertEquals(len(again), 100)
+
+            # changing the data file makes a new entry
+            gzip.open(copy, 'wb').writelines(lines[:50])
+            changed = survey.ColumnPregnancies()
+            changed.ReadRecords(data_dir, cache=True)
+            self.assertEquals(len(changed), 50)
+        finally:
+            shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
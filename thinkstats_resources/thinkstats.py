@@ -6,6 +6,43 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
 import bisect
+import collections
+import itertools
+import math
+import random
+
+import numpy
+
+# number of values Moments and CoMoments convert to an array at a time
+CHUNK_SIZE = 2**16
+
+# how many results Binom keeps
+BINOM_CACHE_SIZE = 1024
+
+# the largest n whose log factorial LogFactorial keeps in its table
+LOG_FACTORIAL_MAX = 2**20
+
+
+def RandomState(seed=None):
+    """Makes a NumPy random number generator.
+
+    Args:
+        seed: None, to seed the generator from the random module, so
+              that random.seed makes the results reproducible;
+              an int seed; a random.Random object to seed from;
+              or a numpy.random.RandomState, which is returned as is
+
+    Returns:
+        numpy.random.RandomState
+    """
+    if isinstance(seed, numpy.random.RandomState):
+        return seed
+    if seed is None:
+        seed = random.getrandbits(32)
+    elif isinstance(seed, random.Random):
+        seed = seed.getrandbits(32)
+    return numpy.random.RandomState(seed)
+
 
 def Mean(t):
     """Computes the mean of a sequence of numbers.
@@ -22,63 +59,110 @@ def Mean(t):
 def MeanVar(t):
     """Computes the mean and variance of a sequence of numbers.
 
+    Makes one pass over t, so it can be an iterator.
+
     Args:
         t: sequence of numbers
 
     Returns:
         tuple of two floats
     """
-    mu = Mean(t)
-    var = Var(t, mu)
-    return mu, var
+    moments = Moments(t)
+    return moments.Mean(), moments.Var()
 
 
 def Trim(t, p=0.01):
     """Trims the largest and smallest elements of t.
 
+    Finds the cut points by partial selection, in linear time, and
+    does not modify t.
+
     Args:
         t: sequence of numbers
         p: fraction of values to trim off each end
 
     Returns:
-        sequence of values
+        list of the remaining values, in no particular order
     """
-    t.sort()
-    n = int(p * len(t))
-    t = t[n:-n]
-    return t
+    return _TrimArray(t, p).tolist()
 
 
-def TrimmedMean(t, p=0.01):
-    """Computes the trimmed mean of a sequence of numbers.
+def _TrimArray(t, p):
+    """Trims the largest and smallest elements of t; see Trim.
+
+    Returns:
+        array of the remaining values
+    """
+    a = numpy.asarray(t)
+    n = len(a)
+    k = int(p * n)
+    if k == 0:
+        return a.copy()
+    return numpy.partition(a, [k, n-k-1])[k:n-k]
+
+
+def WeightedTrim(t, weights, p=0.01):
+    """Trims the values with the largest and smallest weighted ranks.
 
-    Side effect: sorts the list.
+    Removes a fraction p of the total weight from each end.  A value
+    that straddles a cut point keeps the part of its weight inside.
+    Unlike Trim, this sorts a copy of the values.
 
     Args:
         t: sequence of numbers
-        p: fraction of values to trim off each end
+        weights: sequence of non-negative weights, like finalwgt
+        p: fraction of the total weight to trim off each end
+
+    Returns:
+        tuple of (values, weights) arrays
+    """
+    xs = numpy.asarray(t)
+    ws = numpy.asarray(weights, dtype=numpy.float64)
+    index = numpy.argsort(xs, kind='mergesort')
+    xs = xs[index]
+    ws = ws[index]
+
+    high = ws.cumsum()
+    low = high - ws
+    total = high[-1]
+    cut = p * total
+    kept = numpy.minimum(high, total - cut) - numpy.maximum(low, cut)
+    keep = kept > 0
+    return xs[keep], kept[keep]
+
+
+def TrimmedMean(t, p=0.01, weights=None):
+    """Computes the trimmed mean of a sequence of numbers.
+
+    Args:
+        t: sequence of numbers
+        p: fraction of values (or weight) to trim off each end
+        weights: optional sequence of weights; see WeightedTrim
 
     Returns:
         float
     """
-    t = Trim(t, p)
-    return Mean(t)
+    return TrimmedMeanVar(t, p, weights)[0]
 
 
-def TrimmedMeanVar(t, p=0.01):
+def TrimmedMeanVar(t, p=0.01, weights=None):
     """Computes the trimmed mean and variance of a sequence of numbers.
 
-    Side effect: sorts the list.
-
     Args:
         t: sequence of numbers
-        p: fraction of values to trim off each end
+        p: fraction of values (or weight) to trim off each end
+        weights: optional sequence of weights; see WeightedTrim
 
     Returns:
-        float
+        tuple of two floats
     """
-    t = Trim(t, p)
-    mu, var = MeanVar(t)
+    if weights is None:
+        return MeanVar(_TrimArray(t, p))
+
+    xs, ws = WeightedTrim(t, weights, p)
+    total = ws.sum()
+    mu = ws.dot(xs) / total
+    var = ws.dot((xs - mu)**2) / total
     return mu, var
 
 
@@ -92,55 +176,369 @@ def Var(t, mu=None):
         float
     """
     if mu is None:
-        mu = Mean(t)
+        return Moments(t).Var()
+
+    # compute the mean of the squared deviations without storing them
+    n = 0
+    total = 0.0
+    for x in t:
+        n += 1
+        total += (x - mu)**2
+    return total / n
+
 
-    # compute the squared deviations and return their mean.
-    dev2 = [(x - mu)**2 for x in t]
-    var = Mean(dev2)
-    return var
+class Moments(object):
+    """Accumulates the moments of a sequence of numbers in one pass.
 
+    Values are added in chunks: the central moments of each chunk are
+    computed with NumPy and merged into the running totals with the
+    pairwise update formulas (Chan et al.; Pebay), which are
+    numerically stable.  Moments computed from separate parts of a
+    sequence, for example in parallel, can be combined with Merge.
 
-def Binom(n, k, d={}):
+    Attributes:
+        n: number of values
+        mean: mean of the values
+        m2, m3, m4: sums of the 2nd, 3rd and 4th powers of the
+                    deviations from the mean
+    """
+    def __init__(self, t=()):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.Extend(t)
+
+    def Add(self, x):
+        """Adds a value."""
+        self._Combine(1, float(x), 0.0, 0.0, 0.0)
+
+    def Extend(self, t):
+        """Adds the values in a sequence or iterator."""
+        for chunk in _Chunks(t):
+            mean = chunk.mean()
+            dev = chunk - mean
+            dev2 = dev * dev
+            self._Combine(len(chunk), mean, dev2.sum(),
+                          (dev2 * dev).sum(), (dev2 * dev2).sum())
+
+    def Merge(self, other):
+        """Adds the values accumulated by another Moments object."""
+        self._Combine(other.n, other.mean, other.m2, other.m3, other.m4)
+
+    def _Combine(self, nb, meanb, m2b, m3b, m4b):
+        """Merges the moments of a group of nb values into these."""
+        if nb == 0:
+            return
+        na = self.n
+        n = na + nb
+        d = meanb - self.mean
+        d_n = d / n
+        term = d * d_n * na * nb
+
+        self.m4 += (m4b + term * d_n * d_n * (na*na - na*nb + nb*nb) +
+                    6 * d_n * d_n * (na*na * m2b + nb*nb * self.m2) +
+                    4 * d_n * (na * m3b - nb * self.m3))
+        self.m3 += (m3b + term * d_n * (na - nb) +
+                    3 * d_n * (na * m2b - nb * self.m2))
+        self.m2 += m2b + term
+        self.mean += nb * d_n
+        self.n = n
+
+    def Mean(self):
+        """Returns the mean."""
+        return self.mean
+
+    def Var(self):
+        """Returns the variance (dividing by n)."""
+        return self.m2 / self.n
+
+    def Skewness(self):
+        """Returns the skewness, m3 / m2**1.5 (scaled by n)."""
+        return self.m3 * self.n**0.5 / self.m2**1.5
+
+    def Kurtosis(self):
+        """Returns the excess kurtosis, which is 0 for a normal."""
+        return self.m4 * self.n / (self.m2 * self.m2) - 3.0
+
+
+class CoMoments(object):
+    """Accumulates means, variances and covariance of pairs in one pass.
+
+    Works like Moments, for pairs of values.
+
+    Attributes:
+        n: number of pairs
+        meanx, meany: means of the xs and ys
+        m2x, m2y: sums of the squared deviations of the xs and ys
+        cxy: sum of the products of the deviations
+    """
+    def __init__(self, xs=(), ys=()):
+        self.n = 0
+        self.meanx = 0.0
+        self.meany = 0.0
+        self.m2x = 0.0
+        self.m2y = 0.0
+        self.cxy = 0.0
+        self.Extend(xs, ys)
+
+    def Add(self, x, y):
+        """Adds a pair of values."""
+        self._Combine(1, float(x), float(y), 0.0, 0.0, 0.0)
+
+    def Extend(self, xs, ys):
+        """Adds pairs of values from two sequences or iterators.
+
+        Like zip, stops at the end of the shorter one.
+        """
+        pairs = itertools.izip(xs, ys)
+        for chunk in _Chunks(itertools.chain.from_iterable(pairs)):
+            x = chunk[0::2]
+            y = chunk[1::2]
+            meanx = x.mean()
+            meany = y.mean()
+            devx = x - meanx
+            devy = y - meany
+            self._Combine(len(x), meanx, meany, devx.dot(devx),
+                          devy.dot(devy), devx.dot(devy))
+
+    def Merge(self, other):
+        """Adds the pairs accumulated by another CoMoments object."""
+        self._Combine(other.n, other.meanx, other.meany,
+                      other.m2x, other.m2y, other.cxy)
+
+    def _Combine(self, nb, meanx, meany, m2x, m2y, cxy):
+        """Merges the moments of a group of nb pairs into these."""
+        if nb == 0:
+            return
+        na = self.n
+        n = na + nb
+        dx = meanx - self.meanx
+        dy = meany - self.meany
+        f = float(na) * nb / n
+
+        self.m2x += m2x + dx * dx * f
+        self.m2y += m2y + dy * dy * f
+        self.cxy += cxy + dx * dy * f
+        self.meanx += dx * nb / n
+        self.meany += dy * nb / n
+        self.n = n
+
+    def VarX(self):
+        """Returns the variance of the xs."""
+        return self.m2x / self.n
+
+    def VarY(self):
+        """Returns the variance of the ys."""
+        return self.m2y / self.n
+
+    def Cov(self):
+        """Returns Cov(X, Y)."""
+        return self.cxy / self.n
+
+    def Corr(self):
+        """Returns Pearson's correlation."""
+        return self.cxy / (self.m2x * self.m2y)**0.5
+
+
+def _Chunks(t):
+    """Generates float arrays of up to CHUNK_SIZE values from t.
+
+    Args:
+        t: sequence or iterator of numbers
+
+    Returns:
+        iterator of non-empty arrays
+    """
+    if isinstance(t, numpy.ndarray):
+        t = t.ravel()
+        for i in range(0, len(t), CHUNK_SIZE):
+            yield numpy.asarray(t[i:i+CHUNK_SIZE], dtype=numpy.float64)
+        return
+
+    it = iter(t)
+    while True:
+        chunk = numpy.fromiter(itertools.islice(it, CHUNK_SIZE),
+                               dtype=numpy.float64)
+        if not len(chunk):
+            return
+        yield chunk
+
+
+def Binom(n, k):
     """Compute the binomial coefficient "n choose k".
 
+    For ints, computes the exact result with the multiplicative
+    formula and keeps the most recent BINOM_CACHE_SIZE results.
+    If n or k is an array, returns an array of floats; see LogBinom.
+
     Args:
       n: number of trials
       k: number of successes
-      d: map from (n,k) tuples to cached results
 
     Returns:
-      int
+      int, or array of floats
     """
-    if k == 0:
-        return 1
-    if n == 0:
+    if numpy.ndim(n) or numpy.ndim(k):
+        return numpy.exp(LogBinom(n, k))
+
+    if k < 0 or k > n:
         return 0
+    k = min(k, n - k)
 
     try:
-        return d[n, k]
+        res = _binom_cache.pop((n, k))
     except KeyError:
-        res = Binom(n-1, k) + Binom(n-1, k-1)
-        d[n, k] = res
-        return res
+        res = 1
+        for i in range(1, k + 1):
+            res = res * (n - k + i) // i
+        if len(_binom_cache) >= BINOM_CACHE_SIZE:
+            _binom_cache.popitem(last=False)
+
+    _binom_cache[n, k] = res
+    return res
+
+
+# results of Binom in order of use, most recent last
+_binom_cache = collections.OrderedDict()
+
+
+def LogBinom(n, k):
+    """Computes the log of "n choose k" for ints or arrays of ints.
+
+    Where k < 0 or k > n the result is -inf.
+
+    Args:
+      n: number or array of trials
+      k: number or array of successes
+
+    Returns:
+      float or array of floats
+    """
+    n = numpy.asarray(n, dtype=numpy.int64)
+    k = numpy.asarray(k, dtype=numpy.int64)
+    valid = (k >= 0) & (k <= n)
+    k = numpy.where(valid, k, 0)
+    n = numpy.where(valid, n, 0)
+
+    res = LogFactorial(n) - LogFactorial(k) - LogFactorial(n - k)
+    return numpy.where(valid, res, -numpy.inf)[()]
+
+
+def LogFactorial(n):
+    """Computes the log of n! for an int or array of ints.
+
+    Looks up results in a table of cumulative sums of logs, which grows
+    as needed up to LOG_FACTORIAL_MAX; beyond that, uses math.lgamma.
+
+    Args:
+      n: non-negative int or array of ints
+
+    Returns:
+      float or array of floats
+    """
+    global _log_factorials
+
+    n = numpy.asarray(n, dtype=numpy.int64)
+    top = n.max() if n.size else 0
+    if top > LOG_FACTORIAL_MAX:
+        lgamma = numpy.vectorize(math.lgamma, otypes=[numpy.float64])
+        return lgamma(n + 1.0)[()]
+
+    if top >= len(_log_factorials):
+        size = min(max(top + 1, 2 * len(_log_factorials)),
+                   LOG_FACTORIAL_MAX + 1)
+        logs = numpy.log(numpy.arange(1, size))
+        _log_factorials = numpy.concatenate([[0.0], logs.cumsum()])
+
+    return _log_factorials[n][()]
+
+
+# log factorials of 0 through len-1
+_log_factorials = numpy.zeros(1)
+
+
+def BinomialPmf(k, n, p):
+    """Computes the probability of k successes in n trials.
+
+    Evaluates in log space, so it works for large n; see
+    LogBinomialPmf.  The arguments can be numbers or arrays.
+
+    Args:
+      k: number of successes
+      n: number of trials
+      p: probability of success
+
+    Returns:
+      float or array of floats
+    """
+    return numpy.exp(LogBinomialPmf(k, n, p))
+
+
+def LogBinomialPmf(k, n, p):
+    """Computes the log probability of k successes in n trials.
+
+    Args:
+      k: number of successes
+      n: number of trials
+      p: probability of success
+
+    Returns:
+      float or array of floats
+    """
+    k = numpy.asarray(k)
+    n = numpy.asarray(n)
+    p = numpy.asarray(p, dtype=numpy.float64)
+
+    # with p = 0 or 1, 0 * log(0) counts as 0
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        logp = numpy.where(k == 0, 0.0, k * numpy.log(p))
+        logq = numpy.where(k == n, 0.0, (n - k) * numpy.log1p(-p))
+    return (LogBinom(n, k) + logp + logq)[()]
 
 
 class Interpolator(object):
     """Represents a mapping between sorted sequences; performs linear interp.
 
+    Lookup and Reverse take a number or an array of numbers; for an
+    array they search and interpolate all of the queries at once.
+
+    If xs is evenly spaced, uniform=True computes the index of each
+    query in xs directly instead of searching, so Lookup takes
+    constant time per query.
+
     Attributes:
         xs: sorted list
         ys: sorted list
     """
-    def __init__(self, xs, ys):
+    def __init__(self, xs, ys, uniform=False):
         self.xs = xs
         self.ys = ys
+        self._xarray = numpy.asarray(xs, dtype=numpy.float64)
+        self._yarray = numpy.asarray(ys, dtype=numpy.float64)
+
+        self.step = None
+        if uniform:
+            n = len(self._xarray)
+            step = (self._xarray[-1] - self._xarray[0]) / (n - 1)
+            grid = self._xarray[0] + step * numpy.arange(n)
+            if step <= 0 or not numpy.allclose(grid, self._xarray):
+                raise ValueError('xs is not evenly spaced')
+            self.step = step
 
     def Lookup(self, x):
         """Looks up x and returns the corresponding value of y."""
+        if self.step is not None:
+            return self._Uniform(x)
+        if numpy.ndim(x):
+            return numpy.interp(x, self._xarray, self._yarray)
         return self._Bisect(x, self.xs, self.ys)
 
     def Reverse(self, y):
         """Looks up y and returns the corresponding value of x."""
+        if numpy.ndim(y):
+            return numpy.interp(y, self._yarray, self._xarray)
         return self._Bisect(y, self.ys, self.xs)
 
     def _Bisect(self, x, xs, ys):
@@ -154,4 +552,12 @@ class Interpolator(object):
         y = ys[i-1] + frac * 1.0 * (ys[i] - ys[i-1])
         return y
 
-
+    def _Uniform(self, x):
+        """Looks up x in evenly spaced xs without searching."""
+        xs = self._xarray
+        ys = self._yarray
+        pos = (numpy.asarray(x, dtype=numpy.float64) - xs[0]) / self.step
+        i = numpy.clip(numpy.floor(pos).astype(numpy.int64), 0, len(xs) - 2)
+        frac = numpy.clip(pos - i, 0.0, 1.0)
+        y = ys[i] + frac * (ys[i+1] - ys[i])
+        return y[()]
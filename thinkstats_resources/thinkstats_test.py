@@ -5,7 +5,10 @@ Copyright 2010 Allen B. Downey
 License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
+import math
 import unittest
+
+import numpy
 import thinkstats
 
 class Test(unittest.TestCase):
@@ -31,6 +34,86 @@ class Test(unittest.TestCase):
         self.assertAlmostEquals(var1, 48217.0)
         self.assertAlmostEquals(var2, 48217.0)
 
+    def testMoments(self):
+        t = [1, 1, 1, 3, 3, 591]
+        moments = thinkstats.Moments(iter(t))
+        self.assertEquals(moments.n, 6)
+        self.assertAlmostEquals(moments.Mean(), 100.0)
+        self.assertAlmostEquals(moments.Var(), 48217.0)
+
+        xs = numpy.random.RandomState(17).normal(1e6, 3, size=10001)
+        mu = xs.mean()
+        dev = xs - mu
+        var = (dev**2).mean()
+        skew = (dev**3).mean() / var**1.5
+        kurt = (dev**4).mean() / var**2 - 3
+
+        # one value at a time, in chunks, and merged from parts
+        single = thinkstats.Moments()
+        for x in xs[:100]:
+            single.Add(x)
+        chunked = thinkstats.Moments(xs[100:5000])
+        single.Merge(chunked)
+        single.Merge(thinkstats.Moments(list(xs[5000:])))
+
+        for moments in [single, thinkstats.Moments(xs)]:
+            self.assertEquals(moments.n, len(xs))
+            self.assertAlmostEquals(moments.Mean(), mu)
+            self.assertAlmostEquals(moments.Var(), var)
+            self.assertAlmostEquals(moments.Skewness(), skew)
+            self.assertAlmostEquals(moments.Kurtosis(), kurt)
+
+    def testCoMoments(self):
+        state = numpy.random.RandomState(18)
+        xs = state.normal(1e6, 3, size=1001)
+        ys = 2 * xs + state.normal(0, 1, size=1001)
+        cov = numpy.cov(xs, ys, bias=True)[0][1]
+        corr = numpy.corrcoef(xs, ys)[0][1]
+
+        moments = thinkstats.CoMoments(list(xs[:10]), iter(ys[:10]))
+        for x, y in zip(xs[10:20], ys[10:20]):
+            moments.Add(x, y)
+        moments.Merge(thinkstats.CoMoments(xs[20:], ys[20:]))
+
+        self.assertEquals(moments.n, len(xs))
+        self.assertAlmostEquals(moments.meanx, xs.mean())
+        self.assertAlmostEquals(moments.VarX(), xs.var())
+        self.assertAlmostEquals(moments.VarY(), ys.var())
+        self.assertAlmostEquals(moments.Cov(), cov)
+        self.assertAlmostEquals(moments.Corr(), corr)
+
+    def testTrim(self):
+        t = [5, 3, 9, 1, 7, 2, 8, 4, 6, 0]
+        copy = list(t)
+        trimmed = thinkstats.Trim(t, p=0.2)
+        self.assertEquals(t, copy)
+        self.assertEquals(sorted(trimmed), [2, 3, 4, 5, 6, 7])
+        self.assertEquals(sorted(thinkstats.Trim(t, p=0.01)), sorted(t))
+
+        mu, var = thinkstats.TrimmedMeanVar(t, p=0.2)
+        self.assertAlmostEquals(mu, 4.5)
+        self.assertAlmostEquals(var, 35.0 / 12)
+        self.assertAlmostEquals(thinkstats.TrimmedMean(t, p=0.2), 4.5)
+        self.assertEquals(t, copy)
+
+    def testWeightedTrim(self):
+        t = [5, 3, 9, 1, 7, 2, 8, 4, 6, 0]
+        ws = [2.5] * len(t)
+
+        # equal weights trim the same values as Trim
+        mu, var = thinkstats.TrimmedMeanVar(t, p=0.2, weights=ws)
+        self.assertAlmostEquals(mu, 4.5)
+        self.assertAlmostEquals(var, 35.0 / 12)
+
+        # the value at each cut point keeps part of its weight
+        xs, kept = thinkstats.WeightedTrim([1, 2, 3, 4], [10] * 4, p=0.1)
+        self.assertEquals(list(xs), [1, 2, 3, 4])
+        self.assertEquals(list(kept), [6, 10, 10, 6])
+
+        xs, kept = thinkstats.WeightedTrim([4, 1, 2], [1, 8, 1], p=0.1)
+        self.assertEquals(list(xs), [1, 2])
+        self.assertEquals(list(kept), [7, 1])
+
     def testBinom(self):
         res = thinkstats.Binom(10, 3)
         self.assertEquals(res, 120)
@@ -38,6 +121,37 @@ class Test(unittest.TestCase):
         res = thinkstats.Binom(100, 4)
         self.assertEquals(res, 3921225)
 
+        self.assertEquals(thinkstats.Binom(10, 11), 0)
+        self.assertEquals(thinkstats.Binom(0, 0), 1)
+
+        # no recursion limit for large n
+        res = thinkstats.Binom(5000, 2500)
+        self.assertAlmostEquals(math.log(res),
+                                thinkstats.LogBinom(5000, 2500))
+
+        ns = numpy.array([10, 100, 10])
+        ks = numpy.array([3, 4, 11])
+        res = thinkstats.Binom(ns, ks)
+        self.assertAlmostEquals(res[0], 120)
+        self.assertAlmostEquals(res[1] / 3921225, 1)
+        self.assertEquals(res[2], 0)
+
+    def testBinomialPmf(self):
+        ks = numpy.arange(251)
+        ps = thinkstats.BinomialPmf(ks, 250, 0.56)
+        self.assertAlmostEquals(ps.sum(), 1)
+        self.assertAlmostEquals(ps[140],
+                                thinkstats.Binom(250, 140) *
+                                0.56**140 * 0.44**110)
+
+        self.assertEquals(thinkstats.BinomialPmf(0, 10, 0.0), 1)
+        self.assertEquals(thinkstats.BinomialPmf(10, 10, 1.0), 1)
+        self.assertEquals(thinkstats.BinomialPmf(3, 10, 1.0), 0)
+
+        # large n does not underflow near the mean
+        p = thinkstats.BinomialPmf(5000, 10000, 0.5)
+        self.assertAlmostEquals(p, 0.0079786, places=6)
+
     def testInterp(self):
         xs = [1, 2, 3]
         ys = [4, 5, 6]
@@ -70,5 +184,26 @@ class Test(unittest.TestCase):
         x = interp.Reverse(5.75)
         self.assertAlmostEquals(x, 2.75)
 
+    def testInterpArrays(self):
+        xs = [1, 2, 3]
+        ys = [4, 5, 7]
+        queries = numpy.array([0, 1, 1.5, 2, 2.75, 3, 4])
+        expected = [4, 4, 4.5, 5, 6.5, 7, 7]
+
+        for uniform in [False, True]:
+            interp = thinkstats.Interpolator(xs, ys, uniform=uniform)
+            res = interp.Lookup(queries)
+            self.assertEquals(len(res), len(queries))
+            for y, q, e in zip(res, queries, expected):
+                self.assertAlmostEquals(y, e)
+                self.assertAlmostEquals(interp.Lookup(q), e)
+
+            res = interp.Reverse(numpy.array(expected))
+            for x, q in zip(res, queries.clip(1, 3)):
+                self.assertAlmostEquals(x, q)
+
+        self.assertRaises(ValueError, thinkstats.Interpolator,
+                          [1, 2, 4], ys, uniform=True)
+
 if __name__ == "__main__":
     unittest.main()